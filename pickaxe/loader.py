@@ -0,0 +1,191 @@
+import array
+import collections
+import concurrent.futures
+import contextlib
+import fnmatch
+import mmap
+import multiprocessing
+import os
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from . import tarstream
+from .patterns import output_scan
+
+# Frame columns by array typecode; the strings ('i') are categorical codes
+columns = {
+    'sys': 'i',
+    'proc': 'i',
+    'type': 'i',
+    'locality': 'q',
+    'value': 'd',
+    'value_unit': 'i',
+    'timestamp': 'd',
+    'iteration': 'q',
+    'nodes': 'q',
+    'max_level': 'q',
+    'job': 'i',
+}
+categorical_columns = ['sys', 'proc', 'type', 'value_unit', 'job']
+
+
+def categorize(values, transform=None):
+    # Codes into the distinct values, each decoded (and transformed) once;
+    # groups that did not take part in a match get code -1
+    codes, uniques = pd.factorize(np.where(values == b'', None, values))
+    categories = [i.decode('utf-8') for i in uniques]
+    if transform is not None:
+        categories = [transform(i) for i in categories]
+    return codes.astype(np.int32), categories
+
+
+def dotted(proc):
+    return proc.replace('/', '.')
+
+
+def parse_output(content):
+    # Columns of every counter line of one output (bytes, or a mapping of
+    # it), strings as (codes, categories) local to the output; None when it
+    # has no AGAS counters to count the localities by. Outputs that do not
+    # state their max_level get -1, those without a PBS header no job
+    scan = output_scan(content)
+    if scan.node_count is None:
+        return None
+
+    fields = scan.counters
+    count = len(fields)
+    job = scan.pbs_header.get('Job ID')
+    is_rev = fields[:, 2] != b''
+    return {
+        'sys': categorize(fields[:, 0]),
+        'proc': categorize(
+            np.where(is_rev, fields[:, 3], fields[:, 4]), dotted),
+        'type': categorize(np.where(is_rev, fields[:, 2], fields[:, 5])),
+        'locality': fields[:, 1].astype(np.int64),
+        'value': fields[:, 8].astype(np.float64),
+        'value_unit': categorize(fields[:, 9]),
+        'timestamp': fields[:, 7].astype(np.float64),
+        'iteration': fields[:, 6].astype(np.int64),
+        'nodes': np.full(count, scan.node_count, dtype=np.int64),
+        'max_level': np.full(
+            count, -1 if scan.max_level is None else scan.max_level,
+            dtype=np.int64),
+        'job': (np.full(count, -1 if job is None else 0, dtype=np.int32),
+                [] if job is None else [job]),
+    }
+
+
+def read_output(source, member=None):
+    # Runs in a worker: every worker opens the archive itself and reads just
+    # its member; plain outputs are memory-mapped
+    if member is not None:
+        with zipfile.ZipFile(source, 'r') as arxiv:
+            return parse_output(arxiv.read(member))
+    with open(source, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+            return parse_output(content)
+
+
+def included(name, include):
+    return any(fnmatch.fnmatch(name, i) for i in include)
+
+
+def list_outputs(source, include=('*.out',)):
+    # (archive, member) for the outputs in a zip archive, (output, None) for
+    # a plain output, such as a PBS job's output file
+    if not zipfile.is_zipfile(source):
+        return [(source, None)]
+    with zipfile.ZipFile(source, 'r') as arxiv:
+        return [(source, i) for i in arxiv.namelist() if included(i, include)]
+
+
+def worker_context():
+    # plots.py is a flat script that spawned workers would run all over
+    # again; forked ones start with the loader already imported
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return None
+
+
+class column_buffers(object):
+    # The outputs' columns, appended to typed growable arrays as they come
+    # in, with the strings of all outputs interned into one set of
+    # categories per column; the frame is only built at the end
+    def __init__(self):
+        self.buffers = {
+            name: array.array(typecode) for name, typecode in columns.items()}
+        self.categories = {name: {} for name in categorical_columns}
+
+    def intern(self, name, categories):
+        # Global codes for local ones, with -1 staying -1
+        interned = self.categories[name]
+        return np.array(
+            [interned.setdefault(i, len(interned)) for i in categories] + [-1],
+            dtype=np.int32)
+
+    def extend(self, part):
+        for name, buffer in self.buffers.items():
+            values = part[name]
+            if name in self.categories:
+                codes, categories = values
+                values = self.intern(name, categories)[codes]
+            buffer.frombytes(
+                np.asarray(values, dtype=buffer.typecode).tobytes())
+
+    def frame(self):
+        data = {}
+        for name, buffer in self.buffers.items():
+            values = np.frombuffer(buffer, dtype=buffer.typecode)
+            if name in self.categories:
+                values = pd.Categorical.from_codes(
+                    values, list(self.categories[name]))
+            data[name] = values
+        return pd.DataFrame(data)
+
+
+def load(sources, include=('*.out',), jobs=None, executor=None, window=None):
+    # One frame of the counters in all outputs (members matching one of the
+    # include globs) of the given archives, or of plain outputs, parsed in
+    # parallel, one output per task. Zip members and plain outputs are read
+    # by the workers themselves; tar archives can only be read in order, so
+    # their members are read here and handed over. Either way at most window
+    # outputs are in flight, so their parsed columns do not pile up
+    if isinstance(sources, str):
+        sources = [sources]
+    window = window or 2 * (jobs or os.cpu_count() or 1)
+
+    buffers = column_buffers()
+    pending = collections.deque()
+
+    def collect(limit):
+        while len(pending) > limit:
+            fn, future = pending.popleft()
+            part = future.result()
+            if part is None:
+                print('No data found in "%s". Skipping...' % fn)
+                continue
+            print('Processing "%s"...' % fn)
+            buffers.extend(part)
+
+    with contextlib.ExitStack() as stack:
+        if executor is None:
+            executor = stack.enter_context(
+                concurrent.futures.ProcessPoolExecutor(
+                    jobs, mp_context=worker_context()))
+        for source in sources:
+            if tarstream.is_tar(source):
+                for member, handle in tarstream.members(source, include):
+                    pending.append(
+                        (member, executor.submit(parse_output, handle.read())))
+                    collect(window)
+                continue
+            for path, member in list_outputs(source, include):
+                pending.append((path if member is None else member,
+                                executor.submit(read_output, path, member)))
+                collect(window)
+        collect(0)
+    return buffers.frame()
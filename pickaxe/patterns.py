@@ -1,5 +1,7 @@
 import re
 
+import numpy as np
+
 
 locality_regex = re.compile(r'/agas\{locality#(\d+)[^}]*\}')
 
@@ -10,3 +12,62 @@ pfx_counter_regex = re.compile(
 )
 
 level_regex = re.compile(r'^max_level\s=\s(\d+)$', re.MULTILINE)
+
+# The PBS prologue's "User and Job Data" block
+pbs_header_regex = re.compile(
+    r'^(Job ID|Username|Group|Date|Node):[ \t]+([^\n]*?)[ \t]*$', re.MULTILINE)
+
+# All of the above in one pattern, matched once per line that matters: a
+# counter line (groups 1-10, as in pfx_counter_regex), any other AGAS line
+# (group 11, its locality), the max_level line (group 12) or a PBS header
+# line (groups 13-14). Every other line is skipped. Each alternative starts
+# at the newline before its line, so the search only stops at line breaks
+line_pattern = (
+    r'(?:' + pfx_counter_regex.pattern + r'|' + locality_regex.pattern
+    + r'|' + level_regex.pattern[1:] + r'|' + pbs_header_regex.pattern[1:]
+    + r')')
+line_regex = re.compile(r'\n' + line_pattern, re.MULTILINE)
+line_bytes_regex = re.compile(line_regex.pattern.encode(), re.MULTILINE)
+
+# For the first line, which has no newline before it
+first_line_regex = re.compile(line_pattern, re.MULTILINE)
+first_line_bytes_regex = re.compile(
+    first_line_regex.pattern.encode(), re.MULTILINE)
+
+
+def text(value):
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+class output_scan(object):
+    # What an output (str, bytes or a mapping of it) holds, from a single
+    # line_regex pass: the counter lines' pfx_counter_regex groups, the
+    # localities named on AGAS lines, max_level and the PBS header
+    def __init__(self, content):
+        if isinstance(content, str):
+            first_regex, regex = first_line_regex, line_regex
+            empty, agas = '', 'agas'
+        else:
+            first_regex, regex = first_line_bytes_regex, line_bytes_regex
+            empty, agas = b'', b'agas'
+        first = first_regex.match(content)
+        lines = np.array(
+            ([first.groups(empty)] if first else []) + regex.findall(content),
+            dtype=object).reshape(-1, 14)
+
+        self.counters = lines[lines[:, 0] != empty, :10]
+        self.localities = np.concatenate([
+            self.counters[self.counters[:, 0] == agas, 1],
+            lines[lines[:, 10] != empty, 10]])
+        levels = lines[lines[:, 11] != empty, 11]
+        self.max_level = int(levels[-1]) if len(levels) else None
+        self.pbs_header = {}
+        for key, value in lines[lines[:, 12] != empty, 12:14]:
+            # The first of each, from the prologue
+            self.pbs_header.setdefault(text(key), text(value))
+
+    @property
+    def node_count(self):
+        if not len(self.localities):
+            return None
+        return max(int(i) for i in set(self.localities)) + 1
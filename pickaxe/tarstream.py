@@ -0,0 +1,54 @@
+import bz2
+import fnmatch
+import gzip
+import lzma
+import tarfile
+
+# Kept in step with rcb12.term's rcb12_term/tarstream.py, which reads the
+# same archives; neither tree can import the other
+
+tar_suffixes = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz')
+
+
+def is_tar(path):
+    return path.endswith(tar_suffixes)
+
+
+def strip_tar_suffix(path):
+    for suffix in tar_suffixes:
+        if path.endswith(suffix):
+            return path[:-len(suffix)]
+    return path
+
+
+def decompressed(handle, name):
+    # Members compressed on their own are decompressed as they are read
+    if name.endswith('.xz'):
+        return lzma.open(handle, 'rb')
+    if name.endswith('.gz'):
+        return gzip.open(handle, 'rb')
+    if name.endswith('.bz2'):
+        return bz2.open(handle, 'rb')
+    return handle
+
+
+def members(source, include, prefix=''):
+    # (name, binary stream) for every regular member matching one of the
+    # include globs, read straight out of the (compressed) archive in the
+    # order it was written; nothing is extracted. Each stream has to be
+    # read before the next member is asked for. Members of nested tars are
+    # named as if the nested tar had been extracted into a directory
+    if isinstance(source, str):
+        tar = tarfile.open(source, mode='r|*')
+    else:
+        tar = tarfile.open(fileobj=source, mode='r|*')
+    with tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            name = prefix + member.name
+            if is_tar(member.name):
+                yield from members(tar.extractfile(member), include,
+                                   strip_tar_suffix(name) + '/')
+            elif any(fnmatch.fnmatch(name, i) for i in include):
+                yield name, decompressed(tar.extractfile(member), member.name)
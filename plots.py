@@ -1,13 +1,14 @@
 #!/usr/bin/env python
 # coding: utf-8
 
-import re
+import sys
 import numpy as np
 import pandas as pd
 import matplotlib
 import matplotlib.ticker as ticker
 import matplotlib.pyplot as plt
-import zipfile
+
+from pickaxe.loader import load
 
 
 def percent_formatter(y, position):
@@ -25,79 +26,12 @@ def percent_formatter(y, position):
 PercentFormatter = ticker.FuncFormatter(percent_formatter)
 
 
-# Performance Counter Parsing RegEx
-
-locality_regex = re.compile(r'/agas\{locality#(\d+)[^}]*\}')
-
-
-pfx_counter_regex = re.compile(
-    r'/([a-z_]+){locality#(\d+)/total}/(?:(?:(count|time)/)'
-    '([a-z/_-]+)|([a-z/_-]+)/(?:(count|time))),([0-9]+),'
-    r'([0-9.]+),\[[a-z]+\],([0-9.\+e]+)(?:,\[([a-z]+)?\])?'
-)
-
-
 # Read the Data Files
 
-
-dataset = []
-
-with zipfile.ZipFile('data.zip', 'r') as arxiv:
-    for fn in arxiv.namelist():
-        if fn.endswith('.out'):
-            content = arxiv.read(fn).decode('utf-8')
-            content = arxiv.read(fn).decode('utf-8')
-            localities = set(int(x) for x in locality_regex.findall(content))
-            if (localities):
-                print('Processing "%s"...' % fn)
-            else:
-                print('No data found in "%s". Skipping...' % fn)
-                continue
-            node_count = max(localities) + 1
-
-            for m in pfx_counter_regex.finditer(content):
-                is_rev = m.group(3) is not None
-
-                dataset.append({
-                    'sys': m.group(1),
-                    'proc': (m.group(4) if is_rev else m.group(5)).replace('/', '.'),
-                    'type': m.group(3) if is_rev else m.group(6),
-                    'locality': int(m.group(2)),
-                    'value': float(m.group(9)),
-                    'value_unit': m.group(10),
-                    'timestamp': float(m.group(8)),
-                    'iteration': int(m.group(7)),
-                    'nodes': node_count,
-                })
-
-df = pd.DataFrame(dataset)
-
-
-# import tarfile
-#
-# dataset = []
-#
-# with tarfile.open('cori-17mar17.tar.bz2', mode='r:bz2') as arxiv:
-#     for i in arxiv.getnames():
-#         if i.endswith('.txt'):
-#             n_nodes = int(i.split('.')[0])
-#             fd = arxiv.extractfile(i)
-#             for m in pfx_pattern.finditer(fd.read()):
-#                 is_rev = m.group(3) != None
-#
-#                 dataset.append({
-#                     'sys': m.group(1),
-#                     'proc': (m.group(4) if is_rev else m.group(5)).replace('/', '.'),
-#                     'type': m.group(3) if is_rev else m.group(6),
-#                     'locality': int(m.group(2)),
-#                     'value': float(m.group(9)),
-#                     'value_unit': m.group(10),
-#                     'timestamp': m.group(8),
-#                     'iteration': int(m.group(7)),
-#                     'nodes': n_nodes,
-#                 })
-#
-# df = pd.DataFrame(dataset)
+# Zip or tar archives of outputs (default: data.zip), or plain outputs, given
+# on the command line. Tars are streamed without extracting them, e.g.
+# df = load('cori-17mar17.tar.bz2', include=['*.txt'])
+df = load(sys.argv[1:] or ['data.zip'])
 
 # Last Iteration
 
@@ -0,0 +1,10 @@
+from . import bench_pivot, bench_readers
+
+
+def main():
+    bench_readers.main()
+    bench_pivot.main()
+
+
+if __name__ == "__main__":
+    main()
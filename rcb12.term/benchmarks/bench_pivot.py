@@ -0,0 +1,51 @@
+import os
+import timeit
+
+import pandas as pd
+
+import rcb12_term.process as proc
+import rcb12_term.schema as schema
+
+
+def pivot_table_process_df(df):
+    # process_df as it was before the direct-to-array engine, when thread
+    # ids were floats with NaN for counters outside worker threads
+    df = df.assign(thread_id=df.thread_id.where(
+        df.thread_id != schema.no_thread).astype('float64'))
+
+    octo_pivot = df.pivot_table(
+        index=['iteration', 'locality'],
+        columns=['countername'],
+        values='value',
+        dropna=False)
+    del octo_pivot['idle-rate']
+
+    idle_rate_pivot = df.pivot_table(
+        index=['iteration', 'locality'],
+        columns=['thread_id'],
+        values='value')
+
+    return pd.concat([octo_pivot, idle_rate_pivot], axis=1)
+
+
+def main(target='64_1.txt', repeat=5):
+    assert os.access(target, os.R_OK)
+    with open(target, encoding='utf-8') as f:
+        df = proc.extract_counters(f.read())
+    proc.check_and_prune_fields(df)
+
+    expected = pivot_table_process_df(df)
+    pd.testing.assert_frame_equal(
+        proc.process_df(df), expected, check_index_type=False,
+        check_column_type=False)
+    print('{}: {:,} rows -> {:,} x {:,} table'.format(
+        target, len(df), *expected.shape))
+
+    baseline = None
+    for name, pivot in [('pivot_table', pivot_table_process_df),
+                        ('process_df', proc.process_df)]:
+        elapsed = min(timeit.repeat(
+            lambda: pivot(df), number=1, repeat=repeat))
+        baseline = baseline or elapsed
+        print('{:<22}{:>8.1f} ms{:>8.2f}x'.format(
+            name, elapsed * 1e3, baseline / elapsed))
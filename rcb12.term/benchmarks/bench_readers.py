@@ -0,0 +1,102 @@
+import io
+import os
+import re
+import timeit
+
+import pandas as pd
+
+from rcb12_term.patterns import counter_line_regex
+
+csv_columns = ['full_counter_name', 'iteration', 'timestamp',
+               'timestamp_unit', 'value', 'value_unit']
+csv_dtypes = {'full_counter_name': 'str', 'iteration': 'uint64',
+              'timestamp': 'float64', 'timestamp_unit': 'str',
+              'value': 'float64', 'value_unit': 'str'}
+
+# The readers the converter used to feed pandas' CSV parser with before it
+# tokenized counter lines itself
+
+dec_val_regex = re.compile(
+    r'^(/[^,\n]+)(,[^,\n]+){4,5}$', re.MULTILINE
+)
+
+
+def generator(hpx_out):
+    for i in dec_val_regex.finditer(hpx_out):
+        yield i[0] + '\n'
+
+
+class generator_reader(object):
+    def __init__(self, hpx_out):
+        self.hpx_out = hpx_out
+        self.gen = generator(self.hpx_out)
+
+    def __iter__(self):
+        return self
+
+    def read(self, n=0):
+        try:
+            return next(self.gen)
+        except StopIteration:
+            return ''
+
+
+def filter_counter_lines(hpx_out):
+    lines = counter_line_regex.findall(hpx_out)
+    if not lines:
+        return ''
+    lines.append('')
+    return '\n'.join(lines)
+
+
+class buffered_reader(object):
+    def __init__(self, hpx_out, buffer_size=2 ** 18):
+        self.matches = counter_line_regex.finditer(hpx_out)
+        self.buffer_size = buffer_size
+
+    def __iter__(self):
+        return self
+
+    def read(self, n=-1):
+        if n is None or n <= 0:
+            n = self.buffer_size
+        lines = []
+        size = 0
+        for m in self.matches:
+            lines.append(m[0])
+            size += len(m[0]) + 1
+            if size >= n:
+                break
+        if not lines:
+            return ''
+        lines.append('')
+        return '\n'.join(lines)
+
+
+def read_csv(source):
+    return pd.read_csv(source, names=csv_columns, dtype=csv_dtypes)
+
+
+def main(target='64_1.txt', repeat=5):
+    assert os.access(target, os.R_OK)
+    with open(target, encoding='utf-8') as f:
+        hpx_out = f.read()
+
+    readers = [
+        ('generator_reader', lambda: generator_reader(hpx_out)),
+        ('buffered_reader', lambda: buffered_reader(hpx_out)),
+        ('filter_counter_lines',
+            lambda: io.StringIO(filter_counter_lines(hpx_out))),
+    ]
+
+    rows = len(read_csv(readers[0][1]()))
+    size = len(hpx_out) / 2 ** 20
+    print('{}: {:,} counter lines, {:.1f} MiB'.format(target, rows, size))
+
+    baseline = None
+    for name, make_reader in readers:
+        elapsed = min(timeit.repeat(
+            lambda: read_csv(make_reader()), number=1, repeat=repeat))
+        baseline = baseline or elapsed
+        print('{:<22}{:>8.1f} ms{:>10.1f} MiB/s{:>8.2f}x'.format(
+            name, elapsed * 1e3, size / elapsed, baseline / elapsed))
@@ -0,0 +1,117 @@
+import hashlib
+import os
+import tempfile
+
+import pandas as pd
+from tqdm import tqdm
+
+from . import filters, helpers, process
+from .schema import default_schema
+
+
+def default_cache_dir():
+    return os.environ.get('RCB12_TERM_CACHE') or os.path.join(
+        os.path.expanduser('~'), '.cache', 'rcb12_term')
+
+
+def hash_file(filepath, block_size=2 ** 20):
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class parse_cache(object):
+    # Parsed results keyed by input content, parser version and filter;
+    # least recently used entries are evicted past max_bytes
+    def __init__(self, directory=None, max_bytes=2 ** 30):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, filepath, counter_filter=filters.default_filter,
+            schema=default_schema, validation_mode='strict'):
+        # Results parsed without strict checks are kept apart, so a strict
+        # run never picks up a file that would have failed them
+        config = '{}\n{}\n{}\n{}'.format(
+            process.parser_version, counter_filter, schema, validation_mode)
+        return '{}-{}'.format(
+            hash_file(filepath),
+            hashlib.sha256(config.encode('utf-8')).hexdigest()[:16])
+
+    def path(self, key):
+        return os.path.join(self.directory, key + '.pkl')
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            vdf = pd.read_pickle(path)
+        except OSError:
+            return None
+        except Exception:
+            # Cut off, corrupt or pickled by another pandas version: a miss,
+            # and the entry is of no use any more
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            return None
+        # Mark as recently used
+        os.utime(path)
+        return vdf
+
+    def put(self, key, vdf):
+        handle, temp_path = tempfile.mkstemp(
+            dir=self.directory, suffix='.tmp')
+        os.close(handle)
+        try:
+            vdf.to_pickle(temp_path)
+            os.replace(temp_path, self.path(key))
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        self.evict()
+
+    def entries(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.pkl'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def evict(self):
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        for _, _, path in self.entries():
+            os.remove(path)
+
+
+def convert(filepath, counter_filter=filters.default_filter, cache=None,
+            pc=None, schema=default_schema, validation_mode='strict'):
+    # Parse an HPX output file, serving it from the cache when unchanged
+    cache = cache or parse_cache()
+    pc = pc or tqdm(disable=True)
+
+    key = cache.key(filepath, counter_filter, schema, validation_mode)
+    vdf = cache.get(key)
+    if vdf is None:
+        vdf = process.process_file_chunks(
+            helpers.read_file_chunks(filepath), pc, counter_filter,
+            schema=schema, validation_mode=validation_mode)
+        cache.put(key, vdf)
+    return vdf
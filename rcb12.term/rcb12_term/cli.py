@@ -1,53 +1,555 @@
 #!/usr/bin/env python3
 
+import argparse
 import concurrent.futures
+import multiprocessing
 import os
+import pathlib
+import threading
+import time
 import traceback
 
 from tqdm import tqdm
 
-from . import helpers, process
+from . import (cache, filters, follow, helpers, journal, process, resume,
+               schedule, schema, storage, tarstream, units, validation)
+from .schema import default_schema
 
 
-def run():
-    with tqdm(desc='Listing *.txt.xz files in current directory', leave=False) as pc:
-        hpx_output_files = helpers.list_txt_files_in_cur_dir('*.txt.xz')
+def convert_file(rf, counter_filter=filters.default_filter, show_progress=True,
+                 executor=None, window=1, chunk_size=2 ** 24, parse_cache=None,
+                 output_format='csv', schema=default_schema,
+                 validation_mode='strict', incremental=True,
+                 output_path=None, salvage=False):
+    started = time.perf_counter()
+    note = None
+    with tqdm(desc=rf, total=10, leave=True, disable=not show_progress) as pc:
+        r0f = os.path.join(os.curdir, rf)
+        of = output_path or helpers.get_output_path(
+            rf, storage.formats[output_format])
+        config = resume.config_digest(counter_filter, schema, output_format)
+        vdf = None
+        with helpers.progress_block('Looking up parse cache', pc):
+            if parse_cache is not None:
+                key = parse_cache.key(
+                    r0f, counter_filter, schema, validation_mode)
+                vdf = parse_cache.get(key)
 
-    def task_process_file(rf):
-        with tqdm(desc=rf, total=11, leave=True) as pc:
-            r0f = os.path.join(os.curdir, rf)
-            with helpers.progress_block('Reading', pc):
-                hpx_out = helpers.read_file(r0f)
+        resumed = tracker = None
+        if vdf is None:
+            truncated = helpers.truncation() if salvage else None
+            with helpers.progress_block('Opening', pc):
+                if incremental and not salvage:
+                    # An output made from an earlier prefix of this input
+                    # only needs the rest parsed
+                    resumed = resume.open_resumable(r0f, of, config, chunk_size)
+                if resumed is None:
+                    tracker = resume.input_tracker()
+                    hpx_out_chunks = tracker.track(helpers.read_file_chunks(
+                        r0f, chunk_size, truncated))
+                else:
+                    meta, tracker, hpx_out_chunks = resumed
 
-            vdf = process.process_file(hpx_out, pc)
+            vdf = process.process_file_chunks(
+                hpx_out_chunks, pc, counter_filter, executor, window, schema,
+                validation_mode, partial=resumed is not None)
 
-            of = helpers.get_csv_output_path(rf)
+            if truncated is not None and truncated.error is not None:
+                # Keep what the input holds up to its last full iteration
+                vdf, dropped = process.drop_incomplete_iteration(vdf)
+                note = 'cut off ({}), kept {} iteration(s){}'.format(
+                    truncated.error, len(vdf.index.unique('iteration')),
+                    '' if dropped is None else
+                    ', dropped incomplete iteration {}'.format(dropped))
+            # Only whole files are cached
+            elif parse_cache is not None and resumed is None:
+                parse_cache.put(key, vdf)
+        else:
+            pc.update(6)
 
-            with helpers.progress_block('Exporting to ' + of, pc):
-                vdf.to_csv(of, float_format='%g')
+        with helpers.progress_block('Exporting to ' + of, pc):
+            if resumed is not None and vdf is None:
+                # The input only grew by lines that add no counters
+                resume.restamp(of, meta, r0f)
+                appended = True
+            elif resumed is not None:
+                appended = resume.append(
+                    vdf, of, output_format, meta, tracker, config, r0f)
+            elif tracker is not None:
+                resume.write(vdf, of, output_format, tracker, config, r0f)
+            else:
+                storage.write(vdf, of, output_format)
+                resume.stamp(of, config, r0f)
 
-            with helpers.progress_block('Exported ' + of, pc):
-                pc.update()
+        if resumed is not None and not appended:
+            # New columns showed up; the whole file has to be redone
             pc.close()
+            return convert_file(
+                rf, counter_filter, show_progress, executor, window,
+                chunk_size, parse_cache, output_format, schema,
+                validation_mode, incremental=False, output_path=of,
+                salvage=salvage)
+
+        with helpers.progress_block('Exported ' + of, pc):
+            pc.update()
+        pc.close()
+    return of, time.perf_counter() - started, note
+
+
+def convert_archive(rf, output_path, include=tarstream.default_include,
+                    counter_filter=filters.default_filter, executor=None,
+                    window=1, chunk_size=2 ** 24, output_format='csv',
+                    schema=default_schema, validation_mode='strict',
+                    force=False):
+    # Streams the members of a tar archive through the parser one after
+    # the other instead of extracting it first. Yields (member, output,
+    # elapsed, exception or None) for every member that was converted.
+    # Once all members are, the archive is stamped and not read again
+    # until it changes
+    config = resume.config_digest(counter_filter, schema, output_format)
+    member_root = archive_member_root(output_path)
+    if not force and resume.archive_members(
+            member_root, config, rf, include) is not None:
+        return
+    converted = []
+    complete = True
+    for name, handle in tarstream.members(rf, include):
+        if not tarstream.is_safe(name):
+            complete = False
+            yield os.path.join(rf, name), None, 0.0, ValueError(
+                'Member path leaves the output tree: ' + name)
+            continue
+        of = output_path(name)
+        if not force and resume.staleness(rf, of, config) is None:
+            converted.append((name, of))
+            continue
+        started = time.perf_counter()
+        try:
+            vdf = process.process_file_chunks(
+                helpers.read_chunks(handle, chunk_size), tqdm(disable=True),
+                counter_filter, executor, window, schema, validation_mode)
+            os.makedirs(os.path.dirname(of) or os.curdir, exist_ok=True)
+            storage.write(vdf, of, output_format)
+            # Stamped with the archive: its members are redone once it
+            # changes
+            resume.stamp(of, config, rf)
+            converted.append((name, of))
+            error = None
+        except Exception as ex:
+            complete = False
+            error = ex
+        yield os.path.join(rf, name), of, time.perf_counter() - started, error
+    if complete:
+        resume.stamp_archive(member_root, config, rf, include, converted)
+
+
+def archive_member_root(output_path):
+    # Where the outputs of an archive's members go, given where one goes
+    return os.path.dirname(output_path('member'))
+
+
+def process_pool(jobs):
+    # Coordinator threads submit to the pool, which may start workers then;
+    # a worker forked while another thread holds a lock would inherit it
+    # held, so workers are started from a fork server (or spawned) instead
+    methods = multiprocessing.get_all_start_methods()
+    return concurrent.futures.ProcessPoolExecutor(
+        jobs, mp_context=multiprocessing.get_context(
+            'forkserver' if 'forkserver' in methods else 'spawn'))
+
+
+executors = {
+    'process': process_pool,
+    'thread': concurrent.futures.ThreadPoolExecutor,
+}
+
+
+def run(counter_filter=filters.default_filter, executor='process', jobs=None,
+        intra_file=False, chunk_size=2 ** 24, parse_cache=None,
+        output_format='csv', schema=default_schema, validation_mode='strict',
+        incremental=True, roots=(os.curdir,),
+        patterns=helpers.default_patterns,
+        recursive=False, output_dir=None, force=False, dry_run=False,
+        salvage=False, journal_path=journal.default_journal_path,
+        include=tarstream.default_include):
+    with tqdm(desc='Listing {} files'.format(', '.join(patterns)),
+              leave=False) as pc:
+        hpx_output_files, base = helpers.find_input_files(
+            roots, patterns, recursive)
+    # Tar archives are streamed member by member, see convert_archive
+    archives = [rf for rf in hpx_output_files if tarstream.is_tar(rf)]
+    hpx_output_files = [
+        rf for rf in hpx_output_files if not tarstream.is_tar(rf)]
+
+    # Outputs go next to their inputs, or into a tree under output_dir that
+    # mirrors the inputs
+    suffix = storage.formats[output_format]
+
+    def output_path(rf):
+        if output_dir is None:
+            return helpers.get_output_path(rf, suffix)
+        return helpers.get_mirrored_output_path(rf, base, output_dir, suffix)
+
+    def member_output_path(rf):
+        # Where the output would go if the archive had been extracted
+        directory = tarstream.strip_tar_suffix(rf)
+        return lambda name: output_path(os.path.join(directory, name))
+
+    outputs = {rf: output_path(rf) for rf in hpx_output_files}
+    # Inputs that convert to the same output, such as 1.txt next to
+    # 1.txt.xz, would overwrite each other's output and stamp: only the
+    # first one listed is converted
+    converted_by = {}
+    for rf in hpx_output_files:
+        converted_by.setdefault(outputs[rf], rf)
+    for rf in hpx_output_files:
+        if converted_by[outputs[rf]] != rf:
+            print('Skipping {}: {} is converted to the same {}'.format(
+                rf, converted_by[outputs[rf]], outputs[rf]))
+            del outputs[rf]
+    hpx_output_files = [rf for rf in hpx_output_files if rf in outputs]
+
+    # Like make: only inputs whose outputs are missing or out of date
+    config = resume.config_digest(counter_filter, schema, output_format)
+    stale = {}
+    for rf in hpx_output_files:
+        reason = 'forced' if force else resume.staleness(
+            rf, outputs[rf], config)
+        if reason is not None:
+            stale[rf] = reason
+    current_count = len(hpx_output_files) - len(stale)
+    # Archives stamped as converted, and unchanged since, are not opened
+    for rf in list(archives):
+        current = None if force else resume.archive_members(
+            archive_member_root(member_output_path(rf)), config, rf, include)
+        if current is not None:
+            archives.remove(rf)
+            current_count += len(current)
+    batch = journal.journal(journal_path)
+    if dry_run:
+        for rf, reason in stale.items():
+            if batch.status(rf) == 'failed':
+                reason += '; failed last time: ' + batch.entries[rf]['error']
+            print('{} -> {} ({})'.format(rf, outputs[rf], reason))
+        stale_count = len(stale)
+        for rf in archives:
+            # Only the member headers are looked at, but the whole archive
+            # is still read through
+            member_output = member_output_path(rf)
+            for name, _ in tarstream.members(rf, include):
+                if not tarstream.is_safe(name):
+                    print('{} skipped: member path leaves the output '
+                          'tree'.format(os.path.join(rf, name)))
+                    continue
+                of = member_output(name)
+                reason = 'forced' if force else resume.staleness(
+                    rf, of, config)
+                if reason is None:
+                    current_count += 1
+                else:
+                    stale_count += 1
+                    print('{} -> {} ({})'.format(
+                        os.path.join(rf, name), of, reason))
+        print('{} file(s) to convert, {} up to date'.format(
+            stale_count, current_count))
+        return
+    if not stale and not archives:
+        print('All {} output(s) are up to date'.format(current_count))
+        return
+    hpx_output_files = list(stale)
+    for rf in hpx_output_files:
+        os.makedirs(os.path.dirname(outputs[rf]) or os.curdir, exist_ok=True)
+    # Forced conversions start from scratch
+    incremental = incremental and not force
+
+    jobs = jobs or helpers.available_cores()
+    split, whole = schedule.schedule(hpx_output_files, jobs, intra_file)
+    # All files share one schedule and one pool, wherever they were found.
+    # Worker processes write their own outputs; per-file progress bars from
+    # several processes would garble the terminal, so only threads show them
+    show_progress = executor == 'thread'
+
+    subject_count = len(hpx_output_files) + len(archives)
+    members = []
+    # Chunks of split files and archive members in flight, between all of
+    # them: each is up to chunk_size in the parent until its result is in
+    window = threading.BoundedSemaphore(2 * jobs)
+
+    def stream_archive(rf):
+        # Members are recorded as each one is done
+        for name, of, elapsed, error in convert_archive(
+                rf, member_output_path(rf), include, counter_filter, pool,
+                window, chunk_size, output_format, schema, validation_mode,
+                force):
+            members.append(name)
+            if error is None:
+                batch.record(name, 'done', of, elapsed)
+                pc.write('{} -> {} ({:.1f}s)'.format(name, of, elapsed))
+            else:
+                batch.record(name, 'failed', of, elapsed, '{}: {}'.format(
+                    type(error).__name__, error))
+                pc.write('{} Generated exception: {}'.format(name, error))
 
-    subject_count = len(hpx_output_files)
     with tqdm(desc='Convert HPX output file(s) to CSV', total=subject_count,
               position=0) as pc:
-        with concurrent.futures.ThreadPoolExecutor(4) as executor:
-            conversion_tasks = {
-                executor.submit(task_process_file, rf):
-                    rf for rf in hpx_output_files
-            }
+        usage = schedule.utilization(jobs)
+        # Every coordinator keeps its file's results until it is written, so
+        # no more of them run than there are workers to keep busy
+        with executors[executor](jobs) as pool, \
+                concurrent.futures.ThreadPoolExecutor(
+                    max(1, min(jobs, len(split) + len(archives)))) \
+                as coordinators:
+            conversion_tasks = {}
+            # Split files are read in the parent and their line-aligned
+            # chunks are queued on the same pool as whole-file tasks
+            for rf in split:
+                future = coordinators.submit(
+                    convert_file, rf, counter_filter, False, pool, window,
+                    chunk_size, parse_cache, output_format, schema,
+                    validation_mode, incremental, outputs[rf], salvage)
+                conversion_tasks[future] = rf
+            for rf in whole:
+                # Workers report their CPU time, see schedule.timed
+                future = pool.submit(
+                    schedule.timed(convert_file), rf, counter_filter,
+                    show_progress, None, 1, chunk_size, parse_cache,
+                    output_format, schema, validation_mode, incremental,
+                    outputs[rf], salvage)
+                conversion_tasks[future] = rf
+            # Archives are read by coordinators too, their members parsed in
+            # chunks on the pool
+            for rf in archives:
+                conversion_tasks[coordinators.submit(stream_archive, rf)] = rf
+
             for future in concurrent.futures.as_completed(conversion_tasks):
                 rf = conversion_tasks[future]
                 try:
-                    future.result()
+                    if rf in archives:
+                        future.result()
+                        pc.update()
+                        continue
+                    if rf in split:
+                        of, elapsed, note = future.result()
+                    else:
+                        cpu, (of, elapsed, note) = future.result()
+                        schedule.worker_cpu.add(cpu)
+                    batch.record(rf, 'done' if note is None else 'salvaged',
+                                 of, elapsed, note)
                     pc.update()
+                    if rf in split or not show_progress or note is not None:
+                        pc.write('{} -> {} ({:.1f}s{})'.format(
+                            rf, of, elapsed, '' if note is None else
+                            ', ' + note))
                 except Exception as ex:
+                    batch.record(rf, 'failed', outputs.get(rf),
+                                 error='{}: {}'.format(type(ex).__name__, ex))
                     print(rf, 'Generated exception:', ex, traceback.format_exc())
+        usage.stop()
 
         pc.set_description('Conversion finished.')
+        pc.write('Converted {} file(s) ({} up to date), {} split into '
+                 'shards; {}'.format(
+                     subject_count, current_count, len(split), usage))
+        pc.write('{} ({}); rerunning retries failed and missing files'.format(
+            batch.summary(hpx_output_files + members), journal_path))
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m rcb12_term',
+        description='Convert HPX output files (*.txt.xz) in the current '
+                    'directory, or under the given roots, to CSV, Parquet '
+                    'or Feather.')
+    parser.add_argument(
+        'roots', nargs='*', default=[os.curdir], metavar='ROOT',
+        help='directories (or globs of directories, or files) to convert '
+             'inputs from (default: the current directory)')
+    parser.add_argument(
+        '-r', '--recursive', action='store_true',
+        help='also look for inputs in every subdirectory of the roots')
+    parser.add_argument(
+        '--pattern', action='append', default=None, metavar='GLOB',
+        help='file names to convert (repeatable, default: {}); '
+             'uncompressed *.txt and *.out inputs are memory-mapped, tar '
+             'archives (*.tar, *.tar.gz, ...) are streamed without '
+             'extracting them'.format(', '.join(helpers.default_patterns)))
+    parser.add_argument(
+        '--include', action='append', default=None, metavar='GLOB',
+        help='members of tar archives (and of tars nested in them) to '
+             'convert (repeatable, default: {})'.format(
+                 ', '.join(tarstream.default_include)))
+    parser.add_argument(
+        '--output-dir', metavar='DIR',
+        help='write outputs into a tree under DIR that mirrors the inputs '
+             '(default: next to each input)')
+    parser.add_argument(
+        '--follow', metavar='PATH',
+        help='convert a growing plain-text HPX output file (or - for stdin) '
+             'instead, appending each iteration as soon as it is complete')
+    parser.add_argument(
+        '-o', '--output', metavar='PATH',
+        help='output of --follow (default: PATH with the output format '
+             'suffix)')
+    parser.add_argument(
+        '--poll-interval', type=float, default=1.0, metavar='SECONDS',
+        help='how often --follow checks a file for new output (default: 1)')
+    parser.add_argument(
+        '--idle-timeout', type=float, default=None, metavar='SECONDS',
+        help='stop following a file after this long without new output '
+             '(default: follow until interrupted)')
+    parser.add_argument(
+        '--executor', choices=sorted(executors), default='process',
+        help='run conversions in worker processes or threads '
+             '(default: process)')
+    parser.add_argument(
+        '-j', '--jobs', type=int, default=None, metavar='N',
+        help='number of workers (default: available cores)')
+    parser.add_argument(
+        '--intra-file', action='store_true',
+        help='split every file into shards; by default only files larger '
+             'than a fair share of the batch are split')
+    parser.add_argument(
+        '--chunk-size', type=int, default=16, metavar='MiB',
+        help='size of the decompressed chunks files are read and parsed in '
+             '(default: 16)')
+    parser.add_argument(
+        '--format', choices=sorted(storage.formats), default='csv',
+        help='output format (default: csv)')
+    parser.add_argument(
+        '--float32', action='store_true',
+        help='keep parsed counter values as float32 to save memory')
+    parser.add_argument(
+        '--unit', action='append', default=[], type=units.parse_unit,
+        metavar='UNIT=SCALE[:CANONICAL]',
+        help='add or override a unit conversion, e.g. [us]=1e-6:[s] '
+             '(repeatable)')
+    parser.add_argument(
+        '--validation', choices=validation.modes, default='strict',
+        help='what to do with malformed counter rows: fail the file, warn '
+             'and convert it anyway, or skip the checks (default: strict)')
+    parser.add_argument(
+        '-f', '--force', action='store_true',
+        help='convert every input, even when its output is up to date')
+    parser.add_argument(
+        '-n', '--dry-run', action='store_true',
+        help='only list the inputs that would be converted, and why')
+    parser.add_argument(
+        '--salvage', action='store_true',
+        help='convert inputs that were cut off up to their last complete '
+             'iteration instead of failing them')
+    parser.add_argument(
+        '--journal', default=journal.default_journal_path, metavar='PATH',
+        help='where the status, timing, output and error of every converted '
+             'file is recorded (default: {})'.format(
+                 journal.default_journal_path))
+    parser.add_argument(
+        '--no-append', action='store_true',
+        help='reconvert whole files even when an existing output already '
+             'covers the start of the same run')
+    parser.add_argument(
+        '--no-cache', action='store_true',
+        help='always parse inputs instead of reusing cached results')
+    parser.add_argument(
+        '--cache-dir', default=None, metavar='DIR',
+        help='where parsed results are cached (default: $RCB12_TERM_CACHE '
+             'or ~/.cache/rcb12_term)')
+    parser.add_argument(
+        '--cache-size', type=int, default=1024, metavar='MiB',
+        help='evict least recently used cache entries past this size '
+             '(default: 1024)')
+    parser.add_argument(
+        '--include-object', action='append', default=[], metavar='NAME',
+        help='only keep counters of this object (repeatable)')
+    parser.add_argument(
+        '--exclude-object', action='append', metavar='NAME',
+        help='drop counters of this object while scanning (repeatable, '
+             'default: {})'.format(', '.join(filters.default_exclude_objects)))
+    parser.add_argument(
+        '--include-counter', action='append', default=[], metavar='NAME',
+        help='only keep this counter (repeatable)')
+    parser.add_argument(
+        '--exclude-counter', action='append', metavar='NAME',
+        help='drop this counter while scanning (repeatable, default: {})'.format(
+            ', '.join(filters.default_exclude_counters)))
+    parser.add_argument(
+        '--keep-all', action='store_true',
+        help='do not apply the default exclusions')
+    args = parser.parse_args(args)
+    if args.follow is not None:
+        if args.format == 'feather':
+            parser.error('--follow cannot append to feather output')
+        if args.output is None and args.follow == '-':
+            parser.error('--follow - needs --output')
+    return args
+
+
+def get_counter_filter(args):
+    def with_default(names, default):
+        if names is None:
+            return [] if args.keep_all else default
+        return names
+
+    return filters.counter_filter(
+        include_objects=args.include_object,
+        exclude_objects=with_default(
+            args.exclude_object, filters.default_exclude_objects),
+        include_counters=args.include_counter,
+        exclude_counters=with_default(
+            args.exclude_counter, filters.default_exclude_counters))
+
+
+def get_schema(args):
+    registry = schema.default_units
+    if args.unit:
+        registry = registry.copy()
+        for unit, scale, canonical in args.unit:
+            registry.register(unit, scale, canonical)
+    return schema.counter_schema(
+        schema.float32_schema.value_dtype if args.float32
+        else default_schema.value_dtype,
+        registry)
+
+
+def get_follow_output(args):
+    if args.output is not None:
+        return args.output
+    return str(pathlib.Path(args.follow).with_suffix(
+        storage.formats[args.format]))
 
 
 def main():
-    run()
+    args = parse_args()
+    if args.follow is not None:
+        follow.follow(
+            args.follow, get_follow_output(args),
+            counter_filter=get_counter_filter(args),
+            output_format=args.format,
+            schema=get_schema(args),
+            validation_mode=args.validation,
+            poll_interval=args.poll_interval,
+            idle_timeout=args.idle_timeout)
+        return
+
+    parse_cache = None
+    if not args.no_cache:
+        parse_cache = cache.parse_cache(
+            args.cache_dir, args.cache_size * 2 ** 20)
+    run(counter_filter=get_counter_filter(args),
+        executor=args.executor,
+        jobs=args.jobs,
+        intra_file=args.intra_file,
+        chunk_size=args.chunk_size * 2 ** 20,
+        parse_cache=parse_cache,
+        output_format=args.format,
+        schema=get_schema(args),
+        validation_mode=args.validation,
+        incremental=not args.no_append,
+        roots=args.roots,
+        patterns=args.pattern or helpers.default_patterns,
+        recursive=args.recursive,
+        output_dir=args.output_dir,
+        force=args.force,
+        dry_run=args.dry_run,
+        salvage=args.salvage,
+        journal_path=args.journal,
+        include=args.include or tarstream.default_include)
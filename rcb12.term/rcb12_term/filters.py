@@ -0,0 +1,38 @@
+from .patterns import as_bytes, make_counter_line_tokenizer
+
+
+class counter_filter(object):
+    def __init__(self, include_objects=(), exclude_objects=(),
+                 include_counters=(), exclude_counters=()):
+        self.include_objects = tuple(include_objects)
+        self.exclude_objects = tuple(exclude_objects)
+        self.include_counters = tuple(include_counters)
+        self.exclude_counters = tuple(exclude_counters)
+        self.tokenizer = make_counter_line_tokenizer(
+            self.include_objects, self.exclude_objects,
+            self.include_counters, self.exclude_counters)
+        self.bytes_tokenizer = as_bytes(self.tokenizer)
+
+    def tokenizer_for(self, hpx_out):
+        if isinstance(hpx_out, str):
+            return self.tokenizer
+        return self.bytes_tokenizer
+
+    def __repr__(self):
+        return ('counter_filter(include_objects={}, exclude_objects={}, '
+                'include_counters={}, exclude_counters={})').format(
+                    list(self.include_objects), list(self.exclude_objects),
+                    list(self.include_counters), list(self.exclude_counters))
+
+
+# AGAS results are not used
+default_exclude_objects = ['agas']
+# Neither are threads...pool#default/worker-thread...count/cumulative-phases
+# and count/cumulative
+default_exclude_counters = ['count/cumulative-phases', 'count/cumulative']
+
+default_filter = counter_filter(
+    exclude_objects=default_exclude_objects,
+    exclude_counters=default_exclude_counters)
+
+no_filter = counter_filter()
@@ -0,0 +1,146 @@
+import os
+import stat
+import sys
+import time
+
+import numpy as np
+from tqdm import tqdm
+
+from . import process, storage, validation
+from .filters import default_filter
+from .names import counter_name_table
+from .schema import default_schema
+
+
+class follower(object):
+    # Parser state kept between reads of a growing HPX output: the partial
+    # last line, the counter name table and the rows of iterations that are
+    # not complete yet
+    def __init__(self, counter_filter=default_filter, schema=default_schema,
+                 validation_mode='strict'):
+        assert validation_mode in validation.modes
+        self.counter_filter = counter_filter
+        self.schema = schema
+        self.validation_mode = validation_mode
+        self.names = counter_name_table()
+        self.remainder = b''
+        self.lines = 0
+        self.pending = []
+        # Distinct counters per iteration, known once the first one is done
+        self.expected = None
+
+    def feed(self, text):
+        # Parse the complete lines of newly appended (undecoded) output and
+        # return the table of the iterations completed by it, or None
+        text = self.remainder + text
+        line_end = text.rfind(b'\n') + 1
+        self.remainder = text[line_end:]
+        if line_end:
+            self.tokenize(text[:line_end])
+        return self.emit(final=False)
+
+    def close(self):
+        # End of input: everything left is as complete as it will get
+        if self.remainder:
+            self.tokenize(self.remainder)
+            self.remainder = b''
+        return self.emit(final=True)
+
+    def tokenize(self, text):
+        report = None
+        if self.validation_mode != 'off':
+            # Starts at the lines already read so failures keep file lines
+            report = validation.validation_report()
+            report.lines = self.lines
+        self.pending.append(process.tokenize_counters(
+            text, self.names, self.counter_filter, self.schema, report))
+        if report is not None:
+            self.lines = report.lines
+            validation.finish(report, self.validation_mode)
+        else:
+            self.lines += text.count(b'\n')
+
+    def emit(self, final):
+        if not self.pending:
+            return None
+        values = process.concat_values(self.pending)
+        iterations = values.iteration.to_numpy()
+        if 0 == len(iterations):
+            self.pending = []
+            return None
+
+        # HPX prints iterations one after another, so an iteration is done
+        # once a later one starts, or once every counter seen in the first
+        # iteration has reported for it
+        first, last = iterations[0], iterations[-1]
+        if self.expected is None and first != last:
+            self.expected = len(np.unique(
+                values.code.to_numpy()[iterations == first]))
+        cutoff = last
+        if final or (self.expected is not None and self.expected <= len(
+                np.unique(values.code.to_numpy()[iterations == last]))):
+            cutoff = last + 1
+
+        done = iterations < cutoff
+        if not done.any():
+            self.pending = [values]
+            return None
+        self.pending = [values[~done].reset_index(drop=True)]
+
+        report = None
+        if self.validation_mode != 'off':
+            report = validation.validation_report()
+        df = process.build_counter_frame(
+            values[done].reset_index(drop=True), self.names)
+        return process.process_counters(
+            df, tqdm(disable=True), self.schema, report, self.validation_mode)
+
+
+def is_regular_file(stream):
+    return stat.S_ISREG(os.fstat(stream.fileno()).st_mode)
+
+
+def read_appended(stream, poll_interval=1.0, idle_timeout=None,
+                  block_size=2 ** 20):
+    # Yield output as it is appended. A pipe ends at EOF; a regular file is
+    # polled for more until idle_timeout seconds pass without new data
+    polling = is_regular_file(stream)
+    idle = 0.0
+    while True:
+        data = stream.read1(block_size)
+        if data:
+            idle = 0.0
+            yield data
+        elif not polling or (idle_timeout is not None and idle >= idle_timeout):
+            break
+        else:
+            time.sleep(poll_interval)
+            idle += poll_interval
+
+
+def follow(source, output, counter_filter=default_filter, output_format='csv',
+           schema=default_schema, validation_mode='strict', poll_interval=1.0,
+           idle_timeout=None, show_progress=True):
+    # Convert a live HPX output file (or '-' for stdin), appending every
+    # completed iteration to output
+    f = follower(counter_filter, schema, validation_mode)
+    sink = storage.appender(output, output_format)
+
+    with tqdm(desc='Following ' + source, unit=' iterations',
+              disable=not show_progress) as pc:
+        def write(vdf):
+            if vdf is not None and len(vdf):
+                sink.append(vdf)
+                pc.update(len(vdf.index.unique('iteration')))
+
+        stream = sys.stdin.buffer if source == '-' else open(source, 'rb')
+        try:
+            for text in read_appended(stream, poll_interval, idle_timeout):
+                write(f.feed(text))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if stream is not sys.stdin.buffer:
+                stream.close()
+        write(f.close())
+        pc.set_description('Followed {} into {}'.format(source, output))
@@ -1,8 +1,16 @@
+import collections
 import contextlib
 import glob
 import lzma
+import mmap
 import os
 import pathlib
+import threading
+
+import numpy as np
+
+# Inputs with these suffixes are uncompressed and read through mmap
+plain_suffixes = ('.txt', '.out')
 
 
 def read_file(filepath):
@@ -13,6 +21,210 @@ def read_file(filepath):
     return hpx_output
 
 
+def read_file_chunks(filepath, chunk_size=2 ** 24, truncated=None):
+    assert os.access(filepath, os.R_OK)
+
+    if is_plain(filepath):
+        yield from map_chunks(map_file(filepath), chunk_size)
+        return
+
+    # Undecoded: the parser works on bytes and only decodes counter names
+    with lzma.open(filepath, 'rb') as hpx_output_handle:
+        yield from read_chunks(hpx_output_handle, chunk_size, truncated)
+
+
+class truncation(object):
+    # Filled in by read_chunks when an input turns out to be cut off
+    def __init__(self):
+        self.error = None
+
+
+def read_blocks(hpx_output_handle, size, truncated, block_size=2 ** 16):
+    # Like read(size), in blocks, so that when the input is cut off only the
+    # block being decoded at that point is lost
+    blocks = []
+    while size > 0 and truncated.error is None:
+        try:
+            block = hpx_output_handle.read(min(size, block_size))
+        except (EOFError, lzma.LZMAError) as ex:
+            truncated.error = str(ex)
+            break
+        if not block:
+            break
+        blocks.append(block)
+        size -= len(block)
+    return b''.join(blocks)
+
+
+def read_chunks(hpx_output_handle, chunk_size=2 ** 24, truncated=None):
+    # Yield line-aligned pieces straight out of the decoder so only one chunk
+    # of decompressed text is alive at a time. With a truncation record, an
+    # input that was cut off ends at its last complete line instead of
+    # raising
+    remainder = b''
+    while True:
+        if truncated is None:
+            chunk = hpx_output_handle.read(chunk_size)
+        else:
+            chunk = read_blocks(hpx_output_handle, chunk_size, truncated)
+        if not chunk:
+            break
+        chunk = remainder + chunk
+        line_end = chunk.rfind(b'\n') + 1
+        remainder = chunk[line_end:]
+        if line_end:
+            yield chunk[:line_end]
+    if remainder and (truncated is None or truncated.error is None):
+        yield remainder
+
+
+def is_plain(filepath):
+    return filepath.endswith(plain_suffixes)
+
+
+def open_mapping(filepath):
+    with open(filepath, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # mmap refuses empty files
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class mapped_range(object):
+    # Bytes start:end of an uncompressed input, seen through a read-only
+    # mapping. Pickles as just the path and the range, so a worker process
+    # maps the file itself (sharing the page cache) instead of being sent
+    # the text
+    def __init__(self, filepath, start, end, mapping=None):
+        self.filepath = filepath
+        self.start = start
+        self.end = end
+        self.mapping = mapping
+
+    def __getstate__(self):
+        return self.filepath, self.start, self.end
+
+    def __setstate__(self, state):
+        self.filepath, self.start, self.end = state
+        self.mapping = None
+
+    def __len__(self):
+        return self.end - self.start
+
+    def sub(self, start, end):
+        return mapped_range(self.filepath, start, end, self.mapping)
+
+    def view(self):
+        if self.mapping is None:
+            self.mapping = open_mapping(self.filepath)
+        return memoryview(self.mapping)[self.start:self.end]
+
+
+def map_file(filepath):
+    mapping = open_mapping(filepath)
+    return mapped_range(filepath, 0, len(mapping), mapping)
+
+
+def map_chunks(mapped, chunk_size=2 ** 24, start=None):
+    # Line-aligned ranges of the mapping, from start on; nothing is copied
+    start = mapped.start if start is None else start
+    mapped.view()
+    while start < mapped.end:
+        end = min(start + chunk_size, mapped.end)
+        if end < mapped.end:
+            line_end = mapped.mapping.rfind(b'\n', start, end) + 1
+            if line_end <= start:
+                # A line longer than a chunk
+                line_end = mapped.mapping.find(b'\n', end, mapped.end) + 1
+            end = line_end if line_end > start else mapped.end
+        yield mapped.sub(start, end)
+        start = end
+
+
+def view(text):
+    # What the parser scans: str and bytes as they are, mapped ranges as a
+    # memoryview of the mapping
+    return text.view() if isinstance(text, mapped_range) else text
+
+
+def count_lines(text):
+    if isinstance(text, memoryview):
+        return int(np.count_nonzero(np.frombuffer(text, np.uint8) == 10))
+    return text.count('\n' if isinstance(text, str) else b'\n')
+
+
+def line_bounds(text, count, start, end):
+    newline = '\n' if isinstance(text, str) else b'\n'
+    bounds = []
+    size = end - start
+    begin = start
+    for i in range(1, count + 1):
+        stop = end if i == count else text.find(
+            newline, max(start, begin + size * i // count), end) + 1
+        if stop <= 0:
+            stop = end
+        if stop > start:
+            bounds.append((start, stop))
+        start = stop
+    return bounds
+
+
+def split_lines(text, count):
+    # Cut text (str, bytes or a mapped range) into at most count pieces,
+    # each ending at a line boundary
+    if isinstance(text, mapped_range):
+        text.view()
+        return [text.sub(start, end) for start, end in line_bounds(
+            text.mapping, count, text.start, text.end)]
+    return [text[start:end]
+            for start, end in line_bounds(text, count, 0, len(text))]
+
+
+def map_bounded(executor, fn, iterable, window, *args):
+    # Like executor.map, but only keeps window tasks in flight so a lazy
+    # iterable of inputs is not drained up front. The window may also be a
+    # semaphore shared by several threads mapping at once, which then keep
+    # that many tasks in flight between them; a thread waits on its own
+    # tasks before it waits for slots the others hold
+    slots = window if hasattr(window, 'acquire') else \
+        threading.BoundedSemaphore(window)
+    pending = collections.deque()
+
+    def retire():
+        try:
+            return pending.popleft().result()
+        finally:
+            slots.release()
+
+    items = iter(iterable)
+    done = object()
+    held = False
+    try:
+        while True:
+            while pending and not slots.acquire(blocking=False):
+                yield retire()
+            if not pending:
+                slots.acquire()
+            held = True
+            item = next(items, done)
+            if item is done:
+                break
+            pending.append(executor.submit(fn, item, *args))
+            held = False
+        while pending:
+            yield retire()
+    finally:
+        # Slots of tasks left behind when the caller gave up early
+        for _ in range(len(pending) + held):
+            slots.release()
+
+
+def available_cores():
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
 def list_txt_files_in_cur_dir(pattern):
     hpx_output_files = glob.glob(pattern)
     assert isinstance(hpx_output_files, list)
@@ -20,8 +232,57 @@ def list_txt_files_in_cur_dir(pattern):
     return hpx_output_files
 
 
+# Input file names looked for when no patterns are given
+default_patterns = ['*.txt.xz']
+
+
+def find_input_files(roots, patterns=default_patterns, recursive=False):
+    # Input files matching one of the patterns under every root (roots may
+    # be globs themselves, or files), each listed once, with the directory
+    # outputs mirror
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    files = []
+    root_dirs = []
+    for root in roots:
+        for path in sorted(glob.glob(root)) or [root]:
+            if os.path.isfile(path):
+                files.append(path)
+                root_dirs.append(os.path.dirname(path) or os.curdir)
+            else:
+                files.extend(sorted(
+                    i for pattern in patterns for i in glob.glob(
+                        os.path.join(path, '**', pattern) if recursive
+                        else os.path.join(path, pattern),
+                        recursive=recursive)))
+                root_dirs.append(path)
+    assert len(files) >= 1
+
+    seen = set()
+    unique = []
+    for path in files:
+        real = os.path.realpath(path)
+        if real not in seen:
+            seen.add(real)
+            unique.append(os.path.normpath(path))
+    return unique, os.path.commonpath(
+        [os.path.abspath(i) for i in root_dirs])
+
+
+def get_mirrored_output_path(original_path, base, output_dir, suffix):
+    # Same place relative to output_dir as the input relative to base
+    relative = os.path.relpath(os.path.abspath(original_path), base)
+    return get_output_path(os.path.join(output_dir, relative), suffix)
+
+
 def get_csv_output_path(original_path):
-    return str(pathlib.Path(original_path[:-3]).with_suffix('.csv'))
+    return get_output_path(original_path, '.csv')
+
+
+def get_output_path(original_path, suffix):
+    if original_path.endswith('.xz'):
+        original_path = original_path[:-3]
+    return str(pathlib.Path(original_path).with_suffix(suffix))
 
 
 @contextlib.contextmanager
@@ -0,0 +1,61 @@
+import datetime
+import json
+import os
+
+
+default_journal_path = 'rcb12_term-journal.jsonl'
+
+statuses = ['done', 'salvaged', 'failed']
+
+
+class journal(object):
+    # Per-input record of a batch: one JSON line per finished conversion,
+    # written as each one completes so a batch that dies part way keeps
+    # what it got done. The last line about an input is the one that counts
+    def __init__(self, path=default_journal_path):
+        self.path = path
+        self.entries = {}
+        try:
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A line cut off when the batch was killed
+                        continue
+                    self.entries[entry['input']] = entry
+        except FileNotFoundError:
+            pass
+
+    def record(self, input_path, status, output_path, elapsed=None,
+               error=None):
+        assert status in statuses
+        entry = {
+            'input': input_path,
+            'status': status,
+            'output': output_path,
+            'elapsed': None if elapsed is None else round(elapsed, 3),
+            'error': error,
+            'time': datetime.datetime.now().isoformat(timespec='seconds'),
+        }
+        self.entries[input_path] = entry
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def status(self, input_path):
+        entry = self.entries.get(input_path)
+        return None if entry is None else entry['status']
+
+    def summary(self, input_paths):
+        counts = dict.fromkeys(statuses, 0)
+        for i in input_paths:
+            status = self.status(i)
+            if status is not None:
+                counts[status] += 1
+        return ', '.join('{} {}'.format(count, status)
+                         for status, count in counts.items())
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+from .patterns import counter_name_tokenizer
+from .schema import name_dtypes, no_thread
+
+
+# Attributes parsed out of every distinct full counter name
+name_attributes = ['objectname', 'locality', 'instancename', 'thread_id',
+                   'countername']
+
+
+class counter_name_table(object):
+    def __init__(self):
+        self.codes = {}
+        self.names = []
+        self.attributes = []
+
+    def __len__(self):
+        return len(self.names)
+
+    def code(self, name):
+        code = self.codes.get(name)
+        if code is None:
+            code = self.codes[name] = self.add(name)
+        return code
+
+    def add(self, name):
+        # Names read straight from the input are decoded here, once each
+        if isinstance(name, bytes):
+            name = name.decode('utf-8')
+        m = counter_name_tokenizer.match(name)
+        if m is None:
+            # Not a counter name we know how to read; its rows are dropped
+            return -1
+        objectname, locality, instancename, thread_id, countername = m.groups()
+        locality = int(locality)
+        # Out of range of the schema's columns; worker thread no_thread
+        # would read as a counter of no thread
+        if locality > np.iinfo(name_dtypes['locality']).max:
+            raise ValueError('Locality out of range: ' + name)
+        if thread_id and int(thread_id) >= no_thread:
+            raise ValueError('Worker thread out of range: ' + name)
+        thread_id = int(thread_id) if thread_id else no_thread
+        self.names.append(name)
+        self.attributes.append((
+            objectname, locality, instancename, thread_id, countername))
+        return len(self.names) - 1
+
+    def intern(self, full_names):
+        # Hash the names once, then only look up each distinct name
+        local_codes, uniques = pd.factorize(full_names)
+        lookup = np.array([self.code(name) for name in uniques] + [-1],
+                          dtype=np.int64)
+        return lookup[local_codes]
+
+    def frame(self, codes):
+        assert 0 == len(codes) or codes.min() >= 0
+
+        objectname, locality, instancename, thread_id, countername = \
+            zip(*self.attributes) if self.attributes else ([],) * 5
+
+        def categorical(values):
+            value_codes, categories = pd.factorize(
+                np.array(values, dtype=object), sort=True)
+            return pd.Categorical.from_codes(value_codes[codes], categories)
+
+        return pd.DataFrame({
+            'full_counter_name': pd.Categorical.from_codes(
+                codes, pd.Index(self.names, dtype=object)),
+            'objectname': categorical(objectname),
+            'locality': np.array(
+                locality, dtype=name_dtypes['locality'])[codes],
+            'instancename': categorical(instancename),
+            'thread_id': np.array(
+                thread_id, dtype=name_dtypes['thread_id'])[codes],
+            'countername': categorical(countername),
+        })
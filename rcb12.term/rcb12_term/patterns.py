@@ -1,26 +1,84 @@
 import re
 
 
-dec_val_regex = re.compile(
-    r'^(/[^,\n]+)(,[^,\n]+){4,5}$', re.MULTILINE
+counter_line_regex = re.compile(
+    r'^/[^,\n]+(?:,[^,\n]+){4,5}$', re.MULTILINE
 )
 
 
-def generator(hpx_out):
-    for i in dec_val_regex.finditer(hpx_out):
-        yield i[0] + '\n'
+general_counter_form_regex = re.compile(
+    r'/(?P<object>[^{\n]+)\{locality#(?P<locality>\d+)'
+    r'/(?:(?:(?P<instance1>pool#[^/\n]+/[^#\n]+)#(?P<thread_id>\d+))'
+    r'|(?P<instance2>[^}\n]+))\}'
+    r'/(?P<counter>[^@\n]+)(?:@(?P<params>.+))?'
+)
+
+# Splits a counter line into its full counter name and the values:
+# name, iteration, timestamp, timestamp unit, value, value unit
+counter_line_tokenizer = re.compile(
+    r'^(/[^,\n]+),(\d+),([^,\n]+),([^,\n]+),([^,\n]+)(?:,([^,\n]+))?$',
+    re.MULTILINE
+)
+
+
+def make_counter_line_tokenizer(include_objects=(), exclude_objects=(),
+                                include_counters=(), exclude_counters=()):
+    # Object and counter names are checked with lookaheads so lines that are
+    # filtered out never match and are never tokenized
+    def alternatives(names):
+        return '|'.join(re.escape(i) for i in names)
+
+    objects = ''
+    if include_objects:
+        objects += r'(?=(?:{})\{{)'.format(alternatives(include_objects))
+    if exclude_objects:
+        objects += r'(?!(?:{})\{{)'.format(alternatives(exclude_objects))
+
+    counters = ''
+    if include_counters:
+        counters += r'(?=(?:{}),)'.format(alternatives(include_counters))
+    if exclude_counters:
+        counters += r'(?!(?:{}),)'.format(alternatives(exclude_counters))
+
+    if not objects and not counters:
+        return counter_line_tokenizer
+
+    return re.compile(
+        r'^(/' + objects + r'[^{,\n]+\{[^},\n]*\}/' + counters + r'[^,\n]+)'
+        r',(\d+),([^,\n]+),([^,\n]+),([^,\n]+)(?:,([^,\n]+))?$',
+        re.MULTILINE
+    )
+
+
+def as_bytes(pattern):
+    # The same regex for undecoded input; counter lines are plain ASCII
+    return re.compile(pattern.pattern.encode('ascii'),
+                      pattern.flags & ~re.UNICODE)
+
+
+counter_line_bytes_tokenizer = as_bytes(counter_line_tokenizer)
+
+
+# Splits a full counter name into object, locality, instance, worker thread
+# id and counter
+counter_name_tokenizer = re.compile(
+    r'/([^{\n]+)\{locality#(\d+)'
+    r'/(pool#default/worker-thread#(\d+)|[^}\n]+)\}'
+    r'/([^,\n]+)$'
+)
+
+
+def get_pfx_counter_line_pattern():
+    return counter_line_regex
+
+
+def get_general_counter_form_pattern():
+    return general_counter_form_regex
 
 
-class generator_reader(object):
-    def __init__(self, hpx_out):
-        self.hpx_out = hpx_out
-        self.gen = generator(self.hpx_out)
+def get_counter_line_tokenizer():
+    return counter_line_tokenizer
 
-    def __iter__(self):
-        return self
 
-    def read(self, n=0):
-        try:
-            return next(self.gen)
-        except StopIteration:
-            return ''
+def get_counter_name_tokenizer():
+    return counter_name_tokenizer
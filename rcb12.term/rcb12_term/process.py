@@ -1,24 +1,26 @@
+import concurrent.futures
+import contextlib
+
 import numpy as np
 import pandas as pd
+from pandas.api.types import union_categoricals
+
+from .helpers import map_bounded, progress_block, split_lines, view
+from .filters import default_filter
+from .names import counter_name_table
+from .schedule import timed, untimed
+from .schema import default_schema, no_thread
+from . import validation
 
-from .helpers import progress_block
-from .patterns import generator_reader
+# Bump whenever parsing changes what ends up in a result, so cached results
+# from older versions are not reused
+parser_version = 3
 
 
 def check_and_prune_fields(df):
-    def drop_irrelevant_counters(df):
-        def drop_values(column, value):
-            df.drop(df.index[df[column] == value], inplace=True)
-        # Drop AGAS results
-        drop_values('objectname', 'agas')
-        # Drop threads...pool#default/worker-thread...count/cumulative-phases
-        drop_values('countername', 'count/cumulative-phases')
-        drop_values('countername', 'count/cumulative')
-
-    # Units can only be [0.01%], 1, [s], and [ns]
-    def check_all_data_units(df):
-        for i in df.value_unit.unique():
-            assert i in ['[s]', '[ns]', '[0.01%]'] or np.isnan(i)
+    # Irrelevant counters are already dropped by the counter filter while
+    # scanning, see filters.default_filter. Units are checked against the
+    # unit registry as they are normalized, see normalize_units
 
     def remove_unused_columns(df):
         del df['timestamp_unit']
@@ -27,81 +29,253 @@ def check_and_prune_fields(df):
 
     assert isinstance(df, pd.DataFrame)
 
-    drop_irrelevant_counters(df)
-    check_all_data_units(df)
     remove_unused_columns(df)
 
 
-def process_df(df):
-    def get_octotiger_counters(df):
-        octo_pivot = df.pivot_table(
-            index=['iteration', 'locality'],
-            columns=['countername'],
-            values='value',
-            dropna=False)
-        del octo_pivot['idle-rate']
-        return octo_pivot
-    octotiger_counters = get_octotiger_counters(df)
-
-    def get_idle_rate_counters(df):
-        idle_rate_pivot = df.pivot_table(
-            index=['iteration', 'locality'],
-            columns=['thread_id'],
-            values='value')
-        return idle_rate_pivot
-    idle_rates = get_idle_rate_counters(df)
-
-    result = pd.concat([octotiger_counters, idle_rates], axis=1)
+def scatter(cells, values, size):
+    # Each cell should hold exactly one value; cells that repeat are
+    # averaged the way pivot_table used to
+    counts = np.bincount(cells, minlength=size)
+    if counts.max(initial=0) <= 1:
+        result = np.full(size, np.nan)
+        result[cells] = values
+    else:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result = np.bincount(cells, weights=values, minlength=size) / counts
     return result
 
 
-def process_file(hpx_out, pc):
-    with progress_block('Extracting counters', pc):
-        df = pd.read_csv(
-            generator_reader(hpx_out),
-            names=['full_counter_name', 'iteration', 'timestamp',
-                   'timestamp_unit', 'value', 'value_unit'],
-            dtype={'full_counter_name': 'str', 'iteration': 'uint64',
-                   'timestamp': 'float64', 'timestamp_unit': 'str',
-                   'value': 'float64', 'value_unit': 'str'},
-        )
-
-    assert 0 != len(df)
-
-    assert 0 == len(df[df.iteration.isna()])
-    assert 0 == len(df[df.timestamp.isna()])
-    assert 0 == len(df[df.timestamp_unit.isna()])
-    assert 0 == len(df[df.value.isna()])
-
-    with progress_block('Parsing counter names', pc):
-        df[['objectname', 'locality', 'instancename', 'countername']] = \
-            df.full_counter_name.str.extract(
-                r'/(.+){locality#(\d+)/(.+)}/(.+)', expand=True)
-
-    assert 0 == len(df[df.objectname.isna()])
-    assert 0 == len(df[df.locality.isna()])
-    assert 0 == len(df[df.instancename.isna()])
-    assert 0 == len(df[df.countername.isna()])
-
-    assert 0 != len(df[df.objectname == 'octotiger'])
-
-    with progress_block('Parsing worker thread ids', pc):
-        df['thread_id'] = df.instancename.str.extract(
-            r'pool#default/worker-thread#(\d+)',
-            expand=True).astype('uint64', errors='ignore')
-
-    df.locality = df.locality.astype('uint64', errors='raise')
-
-    with progress_block('Fixing units', pc):
-        df.iteration = pd.to_numeric(df.iteration, downcast='unsigned')
-        df.timestamp = pd.to_numeric(df.timestamp)
-        df.value = pd.to_numeric(df.value)
-        df.thread_id = pd.to_numeric(df.thread_id, downcast='unsigned')
-
-    with progress_block('Convert nanoseconds to seconds', pc):
-        df.loc[df.value_unit == '[0.01%]', 'value'] *= 0.01
-        df.loc[df.value_unit == '[ns]', 'value'] *= 1.0e-9
-        df.loc[df.value_unit == '[ns]', 'value_unit'] = '[s]'
+def process_df(df):
+    # Rows: every (iteration, locality) pair
+    iterations, iteration_index = np.unique(
+        df.iteration.to_numpy(), return_inverse=True)
+    localities, locality_index = np.unique(
+        df.locality.to_numpy(), return_inverse=True)
+    row = iteration_index * len(localities) + locality_index
+    row_count = len(iterations) * len(localities)
+
+    # Octo-Tiger counters, one column per counter name; per-thread idle
+    # rates, one column per worker thread; any other per-thread counters
+    # (kept by a wider counter filter), one column per counter and thread
+    countername = df.countername.astype('category')
+    counter_codes = countername.cat.codes.to_numpy()
+    categories = countername.cat.categories
+    thread_ids = df.thread_id.to_numpy()
+    has_thread = thread_ids != no_thread
+    is_idle_rate = (categories == 'idle-rate')[counter_codes]
+    is_counter = ~has_thread & ~is_idle_rate
+    is_thread_idle_rate = has_thread & is_idle_rate
+    is_thread_counter = has_thread & ~is_idle_rate
+
+    counters, counter_index = np.unique(
+        counter_codes[is_counter], return_inverse=True)
+    threads, thread_index = np.unique(
+        thread_ids[is_thread_idle_rate], return_inverse=True)
+    thread_counters, thread_counter_index = np.unique(
+        counter_codes[is_thread_counter].astype(np.int64) * (no_thread + 1)
+        + thread_ids[is_thread_counter], return_inverse=True)
+
+    column_count = len(counters) + len(threads) + len(thread_counters)
+    values = df.value.to_numpy()
+    cells = np.concatenate([
+        row[is_counter] * column_count + counter_index,
+        row[is_thread_idle_rate] * column_count + len(counters)
+        + thread_index,
+        row[is_thread_counter] * column_count + len(counters) + len(threads)
+        + thread_counter_index,
+    ])
+    cell_values = np.concatenate([
+        values[is_counter], values[is_thread_idle_rate],
+        values[is_thread_counter]])
+
+    result = scatter(cells, cell_values, row_count * column_count)
+
+    # Float labels keep the existing CSV headers (0.0, 1.0, ...)
+    columns = list(categories[counters]) \
+        + list(threads.astype(np.float64)) \
+        + ['{}#{}'.format(categories[i // (no_thread + 1)],
+                          i % (no_thread + 1)) for i in thread_counters]
+    return pd.DataFrame(
+        result.reshape(row_count, column_count),
+        index=pd.MultiIndex.from_product(
+            [iterations, localities], names=['iteration', 'locality']),
+        columns=pd.Index(columns, dtype=object),
+        copy=False)
+
+
+# Value columns produced by the counter line tokenizer, after the name
+value_columns = ['iteration', 'timestamp', 'timestamp_unit', 'value',
+                 'value_unit']
+optional_value_columns = ['value_unit']
+
+
+def decode(value):
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+def parse_numbers(values, dtype):
+    try:
+        return values.astype(dtype)
+    except ValueError:
+        if not np.issubdtype(dtype, np.floating):
+            raise
+    # Malformed values become NaN, for the row checks to report
+    return pd.to_numeric(
+        pd.Series([decode(i) for i in values], dtype=object),
+        errors='coerce').to_numpy(dtype=dtype)
+
+
+def tokenize_counters(hpx_out, names, counter_filter=default_filter,
+                      schema=default_schema, report=None):
+    # hpx_out is str or, read straight from the input, bytes or a mapped
+    # range; then only distinct names and units are ever decoded
+    hpx_out = view(hpx_out)
+    empty = '' if isinstance(hpx_out, str) else b''
+    tokenizer = counter_filter.tokenizer_for(hpx_out)
+    rows = tokenizer.findall(hpx_out)
+    fields = np.array(rows, dtype=object).reshape(-1, 1 + len(value_columns))
+
+    codes = names.intern(fields[:, 0])
+    known = codes >= 0
+
+    columns = {'code': codes[known]}
+    for i, name in enumerate(value_columns, 1):
+        values = fields[known, i]
+        # findall reports groups that did not take part in a match as ''
+        if name in optional_value_columns:
+            values = np.where(values == empty, None, values)
+        dtype = schema.value_dtypes[name]
+        if dtype == 'category':
+            value_codes, categories = pd.factorize(values)
+            columns[name] = pd.Categorical.from_codes(
+                value_codes, [decode(i) for i in categories])
+        else:
+            # Parse numbers straight from the object array (of str or
+            # bytes), skipping pandas string dtype inference
+            columns[name] = parse_numbers(values, dtype)
+    values = pd.DataFrame(columns)
+
+    if report is not None:
+        # Checked while the text is at hand so failures map to lines;
+        # chunks arrive in file order after the lines already counted
+        report.merge(
+            validation.validate_rows(hpx_out, known, values, names,
+                                     schema.units, tokenizer, fields[:, 0]),
+            report.lines)
+    return values
+
+
+def build_counter_frame(values, names):
+    df = names.frame(values.code.to_numpy())
+    for name in value_columns:
+        df[name] = values[name].array
+    return df
+
+
+def concat_values(frames, schema=default_schema):
+    # pd.concat turns categoricals with differing categories into objects
+    frames = list(frames)
+    if not frames:
+        # An empty input has no chunks; it has no counters either, which
+        # validate_table reports
+        frames = [tokenize_counters('', counter_name_table(), schema=schema)]
+    columns = {}
+    for name in frames[0].columns:
+        parts = [i[name] for i in frames]
+        if isinstance(parts[0].dtype, pd.CategoricalDtype):
+            # Parts without any categories have object categories, others
+            # may have inferred str ones; union_categoricals wants one dtype
+            columns[name] = union_categoricals([
+                pd.Categorical.from_codes(
+                    i.array.codes, i.array.categories.astype(object))
+                for i in parts])
+        else:
+            columns[name] = np.concatenate([i.to_numpy() for i in parts])
+    return pd.DataFrame(columns)
+
+
+def extract_counters(hpx_out, counter_filter=default_filter,
+                     schema=default_schema, report=None):
+    names = counter_name_table()
+    values = tokenize_counters(hpx_out, names, counter_filter, schema, report)
+    return build_counter_frame(values, names)
+
+
+def tokenize_shard(hpx_out, counter_filter=default_filter,
+                   schema=default_schema, validate=True):
+    # Runs in a worker; codes are local to the shard until merged
+    names = counter_name_table()
+    report = validation.validation_report() if validate else None
+    values = tokenize_counters(hpx_out, names, counter_filter, schema, report)
+    return names.names, values, report
+
+
+def merge_shards(shards, names, report=None, schema=default_schema):
+    # Shards arrive in file order; re-code their names into one table
+    frames = []
+    for shard_names, values, shard_report in shards:
+        lookup = names.intern(np.array(shard_names, dtype=object))
+        values['code'] = lookup[values.code.to_numpy()]
+        frames.append(values)
+        if report is not None:
+            report.merge(shard_report, report.lines)
+    return concat_values(frames, schema)
+
+
+def extract_counters_parallel(shards, executor, window,
+                              counter_filter=default_filter,
+                              schema=default_schema, report=None):
+    names = counter_name_table()
+    values = merge_shards(
+        untimed(map_bounded(
+            executor, timed(tokenize_shard), shards, window, counter_filter,
+            schema, report is not None)),
+        names, report, schema)
+    return build_counter_frame(values, names)
+
+
+def drop_incomplete_iteration(vdf):
+    # For inputs that were cut off: the last iteration is only kept when it
+    # has as many values as the fullest iteration before it
+    counts = vdf.notna().to_numpy().sum(axis=1)
+    counts = pd.Series(counts, index=vdf.index).groupby(
+        level='iteration').sum()
+    if len(counts) < 2 or counts.iloc[-1] >= counts.iloc[:-1].max():
+        return vdf, None
+    last = counts.index[-1]
+    return vdf.drop(last, level='iteration'), last
+
+
+def normalize_units(df, units, strict=True):
+    for values, unit in [('value', 'value_unit'),
+                         ('timestamp', 'timestamp_unit')]:
+        normalized = df[values].to_numpy(copy=True)
+        df[unit] = units.normalize(
+            normalized, pd.Categorical(df[unit]), strict)
+        df[values] = normalized
+
+
+def new_report(mode):
+    return None if mode == 'off' else validation.validation_report()
+
+
+def process_counters(df, pc, schema=default_schema, report=None,
+                     validation_mode='strict', partial=False):
+    # Row checks already ran while scanning, see tokenize_counters. The
+    # table checks only make sense for whole files: the tail of a resumed
+    # one may well hold no (octotiger) counters, and then adds nothing
+    with progress_block('Validating', pc):
+        if report is not None:
+            if not partial:
+                validation.validate_table(df, report)
+            validation.finish(report, validation_mode)
+    if partial and 0 == len(df):
+        return None
+
+    with progress_block('Normalizing units', pc):
+        # Unknown units were already reported when validating; without
+        # strict validation their values become NaN
+        normalize_units(df, schema.units, validation_mode == 'strict')
 
     with progress_block('Pruning fields', pc):
         check_and_prune_fields(df)
@@ -110,3 +284,49 @@ def process_file(hpx_out, pc):
         vdf = process_df(df)
 
     return vdf
+
+
+def process_file(hpx_out, pc, counter_filter=default_filter, shards=1,
+                 executor=None, schema=default_schema,
+                 validation_mode='strict'):
+    assert validation_mode in validation.modes
+    report = new_report(validation_mode)
+    with progress_block('Extracting counters', pc):
+        if shards > 1:
+            with contextlib.ExitStack() as stack:
+                if executor is None:
+                    executor = stack.enter_context(
+                        concurrent.futures.ProcessPoolExecutor(shards))
+                df = extract_counters_parallel(
+                    split_lines(hpx_out, shards), executor, shards,
+                    counter_filter, schema, report)
+        else:
+            df = extract_counters(hpx_out, counter_filter, schema, report)
+
+    return process_counters(df, pc, schema, report, validation_mode)
+
+
+def process_file_chunks(hpx_out_chunks, pc, counter_filter=default_filter,
+                        executor=None, window=1, schema=default_schema,
+                        validation_mode='strict', partial=False):
+    assert validation_mode in validation.modes
+    report = new_report(validation_mode)
+    if executor is not None:
+        # Chunks are line-aligned, so they are tokenized as shards
+        with progress_block('Extracting counters', pc):
+            df = extract_counters_parallel(
+                hpx_out_chunks, executor, window, counter_filter, schema,
+                report)
+        return process_counters(
+            df, pc, schema, report, validation_mode, partial)
+
+    with progress_block('Extracting counters', pc):
+        # One name table for the whole file so every chunk shares its codes
+        names = counter_name_table()
+        values = concat_values((
+            tokenize_counters(chunk, names, counter_filter, schema, report)
+            for chunk in hpx_out_chunks), schema)
+        df = build_counter_frame(values, names)
+
+    return process_counters(
+        df, pc, schema, report, validation_mode, partial)
@@ -0,0 +1,301 @@
+import hashlib
+import json
+import lzma
+import os
+import re
+
+import pandas as pd
+
+from . import helpers, process, storage
+from .patterns import counter_line_bytes_tokenizer
+
+
+def config_digest(counter_filter, schema, output_format):
+    config = '{}\n{}\n{}\n{}'.format(
+        process.parser_version, counter_filter, schema, output_format)
+    return hashlib.sha256(config.encode('utf-8')).hexdigest()[:16]
+
+
+def meta_path(output_path):
+    return output_path + '.meta.json'
+
+
+def last_iteration(chunk, window=2 ** 16):
+    # Iterations are printed in order, so the last counter line of a chunk
+    # carries its highest iteration. Scanned in windows from the end, each
+    # from its first whole line; chunk may be a memoryview
+    end = len(chunk)
+    while end > 0:
+        tail = bytes(chunk[max(0, end - window - 1):end])
+        start = tail.find(b'\n') + 1 if end > len(tail) else 0
+        matches = counter_line_bytes_tokenizer.findall(tail, start)
+        if matches:
+            return int(matches[-1][1])
+        end -= len(tail) - start
+    return None
+
+
+def iteration_start(chunk, iteration):
+    m = re.compile(rb'^/[^,\n]+,%d,' % iteration, re.MULTILINE).search(chunk)
+    return m.start() if m else 0
+
+
+class input_tracker(object):
+    # Follows the decompressed (bytes) chunks or mapped ranges of an input
+    # on their way to the parser and keeps the chunk where the last
+    # iteration starts, with its offset and the hash of everything before it
+    def __init__(self, offset=0, digest=None):
+        self.offset = offset
+        self.digest = digest or hashlib.sha256()
+        self.last_iteration = None
+        self.chunk = b''
+        self.chunk_offset = offset
+        self.chunk_digest = self.digest.copy()
+
+    def track(self, chunks):
+        for piece in chunks:
+            chunk = helpers.view(piece)
+            iteration = last_iteration(chunk)
+            if iteration is not None and (
+                    self.last_iteration is None
+                    or iteration > self.last_iteration):
+                self.last_iteration = iteration
+                self.chunk = chunk
+                self.chunk_offset = self.offset
+                self.chunk_digest = self.digest.copy()
+            self.digest.update(chunk)
+            self.offset += len(chunk)
+            yield piece
+
+    def resume_point(self):
+        # Offset of the first line of the last iteration and the hash of
+        # the input before it
+        before = self.chunk[:iteration_start(
+            self.chunk, self.last_iteration)]
+        digest = self.chunk_digest.copy()
+        digest.update(before)
+        return self.chunk_offset + len(before), digest.hexdigest()
+
+
+def load_meta(output_path, config):
+    try:
+        with open(meta_path(output_path)) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # The output must still be exactly what the meta describes
+    if meta.get('config') != config or not os.path.exists(output_path) \
+            or os.path.getsize(output_path) != meta['output_size']:
+        return None
+    return meta
+
+
+def discard(output_path):
+    try:
+        os.remove(meta_path(output_path))
+    except FileNotFoundError:
+        pass
+
+
+def input_stamp(input_path):
+    stat = os.stat(input_path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def save_meta(output_path, config, input_path, tracker=None,
+              output_bytes=None):
+    # Stamps the output with the settings and the input it was made from;
+    # with a tracker, also where a longer version of the input can resume
+    meta = {
+        'config': config,
+        'input': input_stamp(input_path),
+        'output_size': os.path.getsize(output_path),
+    }
+    if tracker is not None and tracker.last_iteration is not None:
+        offset, prefix_sha256 = tracker.resume_point()
+        meta.update({
+            'offset': offset,
+            'prefix_sha256': prefix_sha256,
+            'last_iteration': tracker.last_iteration,
+            'output_bytes': output_bytes,
+        })
+    dump_meta(output_path, meta)
+
+
+def restamp(output_path, meta, input_path):
+    # The output is still what the longer input converts to; later runs
+    # resume from the same point as before
+    dump_meta(output_path, dict(meta, input=input_stamp(input_path)))
+
+
+def dump_meta(output_path, meta):
+    temp_path = meta_path(output_path) + '.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(meta, f, indent=1)
+    os.replace(temp_path, meta_path(output_path))
+
+
+def split_iterations(vdf, iteration):
+    before = vdf.index.get_level_values('iteration') < iteration
+    return vdf[before], vdf[~before]
+
+
+def stamp(output_path, config, input_path):
+    # After writing an output from elsewhere (the parse cache): a meta made
+    # from this very input still holds, otherwise there is no resume point
+    meta = load_meta(output_path, config)
+    if meta is None or meta['input'] != input_stamp(input_path):
+        save_meta(output_path, config, input_path)
+
+
+def staleness(input_path, output_path, config):
+    # Why the output has to be made again, or None when it is up to date
+    if not os.path.exists(output_path):
+        return 'no output'
+    if os.path.getmtime(output_path) < os.path.getmtime(input_path):
+        return 'input is newer'
+    if not os.path.exists(meta_path(output_path)):
+        return 'not stamped'
+    meta = load_meta(output_path, config)
+    if meta is None:
+        return 'other parser version or settings, or output changed'
+    if meta['input'] != input_stamp(input_path):
+        return 'input changed'
+    return None
+
+
+def archive_stamp_path(member_root):
+    # The archive's stamp sits at the top of its members' outputs; as a
+    # meta of this (never written) output, see dump_meta
+    return os.path.join(member_root, 'rcb12_term-archive')
+
+
+def stamp_archive(member_root, config, archive_path, include, members):
+    # Once every member of an archive is converted: the (member, output)
+    # pairs, so later runs can tell they are all current without reading
+    # the archive through
+    os.makedirs(member_root, exist_ok=True)
+    dump_meta(archive_stamp_path(member_root), {
+        'config': config,
+        'input': input_stamp(archive_path),
+        'include': list(include),
+        'members': [list(i) for i in members],
+    })
+
+
+def archive_members(member_root, config, archive_path, include):
+    # The (member, output) pairs of an archive whose outputs are all up to
+    # date, from its stamp; None when the archive has to be read again
+    try:
+        with open(meta_path(archive_stamp_path(member_root))) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get('config') != config \
+            or meta.get('input') != input_stamp(archive_path) \
+            or meta.get('include') != list(include):
+        return None
+    members = meta['members']
+    if any(staleness(archive_path, of, config) is not None
+           for _, of in members):
+        return None
+    return members
+
+
+def write(vdf, output_path, output_format, tracker, config, input_path):
+    # Write the output and remember where its last iteration starts
+    discard(output_path)
+    output_bytes = None
+    if output_format == 'csv' and tracker.last_iteration is not None:
+        # In two parts, so a later run can cut the last iteration off
+        before, after = split_iterations(vdf, tracker.last_iteration)
+        with open(output_path, 'w') as f:
+            before.to_csv(f, float_format='%g')
+            output_bytes = f.tell()
+            after.to_csv(f, header=False, float_format='%g')
+    else:
+        storage.write(vdf, output_path, output_format)
+    save_meta(output_path, config, input_path, tracker, output_bytes)
+
+
+def open_resumable(input_path, output_path, config, chunk_size=2 ** 24):
+    # Chunks of the input from the start of the last iteration already in
+    # the output, and a tracker continuing from there; None when the output
+    # does not cover a prefix of this input
+    meta = load_meta(output_path, config)
+    if meta is None or 'offset' not in meta:
+        return None
+
+    if helpers.is_plain(input_path):
+        # Uncompressed: the prefix is hashed straight from the mapping
+        mapped = helpers.map_file(input_path)
+        if len(mapped) < meta['offset']:
+            return None
+        digest = hashlib.sha256(mapped.sub(0, meta['offset']).view())
+        if digest.hexdigest() != meta['prefix_sha256']:
+            return None
+        tracker = input_tracker(meta['offset'], digest)
+        return meta, tracker, tracker.track(
+            helpers.map_chunks(mapped, chunk_size, meta['offset']))
+
+    handle = lzma.open(input_path, 'rb')
+    digest = hashlib.sha256()
+    remaining = meta['offset']
+    while remaining > 0:
+        try:
+            block = handle.read(min(remaining, 2 ** 20))
+        except (EOFError, lzma.LZMAError):
+            break
+        if not block:
+            break
+        digest.update(block)
+        remaining -= len(block)
+    if remaining > 0 or digest.hexdigest() != meta['prefix_sha256']:
+        handle.close()
+        return None
+
+    tracker = input_tracker(meta['offset'], digest)
+
+    def chunks():
+        with handle:
+            yield from helpers.read_chunks(handle, chunk_size)
+
+    return meta, tracker, tracker.track(chunks())
+
+
+def append(vdf, output_path, output_format, meta, tracker, config,
+           input_path):
+    # Replace the last iteration in the output with the iterations parsed
+    # from the resume point on; False when they do not fit its columns
+    _, vdf = split_iterations(vdf, meta['last_iteration'])
+    if 0 == len(vdf):
+        return False
+
+    if output_format == 'csv':
+        header = pd.read_csv(output_path, index_col=[0, 1], nrows=0).columns
+        columns = {str(i): i for i in vdf.columns}
+        if not set(columns) <= set(header):
+            return False
+        vdf = vdf.reindex(columns=[columns.get(i, i) for i in header])
+
+        discard(output_path)
+        with open(output_path, 'r+') as f:
+            f.truncate(meta['output_bytes'])
+            f.seek(meta['output_bytes'])
+            before, after = split_iterations(vdf, tracker.last_iteration)
+            before.to_csv(f, header=False, float_format='%g')
+            output_bytes = f.tell()
+            after.to_csv(f, header=False, float_format='%g')
+    else:
+        existing, _ = split_iterations(
+            storage.load(output_path), meta['last_iteration'])
+        vdf = storage.compact(vdf)
+        if not set(vdf.columns) <= set(existing.columns):
+            return False
+        vdf = pd.concat([existing, vdf.reindex(columns=existing.columns)])
+        discard(output_path)
+        storage.write(vdf, output_path, output_format)
+        output_bytes = None
+
+    save_meta(output_path, config, input_path, tracker, output_bytes)
+    return True
@@ -0,0 +1,91 @@
+import os
+import threading
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def schedule(hpx_output_files, jobs, split_all=False):
+    # Longest (by compressed size) first, so a big file never starts last
+    # and leaves the other workers idle. Files bigger than a fair share of
+    # the batch are split into shards that any idle worker can pick up.
+    sizes = {rf: os.path.getsize(rf) for rf in hpx_output_files}
+    ordered = sorted(hpx_output_files, key=lambda rf: sizes[rf], reverse=True)
+    fair_share = sum(sizes.values()) / jobs
+
+    def is_split(rf):
+        return split_all or (jobs > 1 and sizes[rf] > fair_share)
+
+    split = [rf for rf in ordered if is_split(rf)]
+    whole = [rf for rf in ordered if not is_split(rf)]
+    return split, whole
+
+
+class cpu_meter(object):
+    # CPU time of the tasks run in worker processes, as they report it:
+    # workers started by a fork server are not children of this process,
+    # so getrusage never sees them
+    def __init__(self):
+        self.total = 0.0
+        self.lock = threading.Lock()
+
+    def add(self, cpu):
+        if cpu is not None:
+            with self.lock:
+                self.total += cpu
+
+
+worker_cpu = cpu_meter()
+
+
+class timed(object):
+    # A task for a pool that returns (CPU time, result); the CPU time is
+    # None when the task ran in this process, where getrusage counts it
+    def __init__(self, fn):
+        self.fn = fn
+        self.pid = os.getpid()
+
+    def __call__(self, *args):
+        started = time.process_time()
+        result = self.fn(*args)
+        if os.getpid() == self.pid:
+            return None, result
+        return time.process_time() - started, result
+
+
+def untimed(results):
+    # The results of timed tasks, their CPU time added to worker_cpu
+    for cpu, result in results:
+        worker_cpu.add(cpu)
+        yield result
+
+
+def cpu_time():
+    # This process's threads, and the tasks of its workers
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime + worker_cpu.total
+
+
+class utilization(object):
+    def __init__(self, jobs):
+        self.jobs = jobs
+        self.wall = time.perf_counter()
+        self.cpu = cpu_time()
+
+    def stop(self):
+        self.wall = time.perf_counter() - self.wall
+        if self.cpu is not None:
+            self.cpu = cpu_time() - self.cpu
+
+    def __str__(self):
+        if self.cpu is None:
+            return '{:.1f}s wall with {} workers'.format(self.wall, self.jobs)
+        return ('{:.1f} CPU-s over {:.1f}s wall with {} workers: '
+                '{:.0%} utilization').format(
+                    self.cpu, self.wall, self.jobs,
+                    self.cpu / max(self.wall * self.jobs, 1e-9))
@@ -0,0 +1,42 @@
+import numpy as np
+
+from .units import default_units
+
+
+# Thread id of counters that do not belong to a worker thread
+no_thread = np.iinfo(np.uint8).max
+
+name_dtypes = {
+    'full_counter_name': 'category',
+    'objectname': 'category',
+    'locality': np.dtype(np.uint16),
+    'instancename': 'category',
+    'thread_id': np.dtype(np.uint8),
+    'countername': 'category',
+}
+
+
+class counter_schema(object):
+    # Column types of the parsed counter table, applied as it is built, and
+    # the units values are normalized with
+    def __init__(self, value_dtype=np.float64, units=default_units):
+        self.value_dtype = np.dtype(value_dtype)
+        self.units = units
+        self.value_dtypes = {
+            'iteration': np.dtype(np.uint32),
+            'timestamp': np.dtype(np.float64),
+            'timestamp_unit': 'category',
+            'value': self.value_dtype,
+            'value_unit': 'category',
+        }
+        self.dtypes = dict(name_dtypes, **self.value_dtypes)
+
+    def __repr__(self):
+        return 'counter_schema(value_dtype={}, units={})'.format(
+            self.value_dtype, self.units)
+
+
+default_schema = counter_schema()
+
+# Opt-in: halves the value column at the cost of precision
+float32_schema = counter_schema(np.float32)
@@ -0,0 +1,88 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+
+formats = {'csv': '.csv', 'parquet': '.parquet', 'feather': '.feather'}
+
+index_dtypes = {'iteration': np.uint32, 'locality': np.uint16}
+
+
+def is_thread_column(label):
+    return not isinstance(label, str)
+
+
+def compact(vdf):
+    # Typed columns for the columnar formats: narrow index levels, float32
+    # idle rates and string column labels
+    index = pd.MultiIndex.from_arrays(
+        [vdf.index.get_level_values(name).astype(index_dtypes[name])
+         for name in vdf.index.names],
+        names=vdf.index.names)
+    columns = {}
+    for label in vdf.columns:
+        values = vdf[label].to_numpy()
+        if is_thread_column(label):
+            values = values.astype(np.float32)
+        columns[str(label)] = values
+    return pd.DataFrame(columns, index=index, copy=False)
+
+
+def write(vdf, path, fmt='csv'):
+    if fmt == 'csv':
+        vdf.to_csv(path, float_format='%g')
+    elif fmt == 'parquet':
+        compact(vdf).to_parquet(path)
+    elif fmt == 'feather':
+        # Feather has no index; uncompressed so it can be memory-mapped
+        compact(vdf).reset_index().to_feather(
+            path, compression='uncompressed')
+    else:
+        raise ValueError('Unknown output format: ' + fmt)
+
+
+class appender(object):
+    # Output that grows as tables arrive: one CSV written with a header
+    # once, or a directory of Parquet parts readable as one dataset. Later
+    # tables are aligned to the columns of the first
+    def __init__(self, path, fmt='csv'):
+        if fmt not in ('csv', 'parquet'):
+            raise ValueError('Cannot append to output format: ' + fmt)
+        self.path = path
+        self.fmt = fmt
+        self.columns = None
+        self.parts = 0
+
+    def append(self, vdf):
+        if self.columns is None:
+            self.columns = vdf.columns
+            if self.fmt == 'parquet':
+                os.makedirs(self.path, exist_ok=True)
+        else:
+            vdf = vdf.reindex(columns=self.columns)
+
+        if self.fmt == 'csv':
+            with open(self.path, 'w' if self.parts == 0 else 'a') as f:
+                vdf.to_csv(f, header=self.parts == 0, float_format='%g')
+        else:
+            # Readers skip dot files, so a part only shows up once complete
+            part = os.path.join(
+                self.path, 'part-{:05d}.parquet'.format(self.parts))
+            temp = os.path.join(self.path, '.part.tmp')
+            compact(vdf).to_parquet(temp)
+            os.replace(temp, part)
+        self.parts += 1
+
+
+def load(path, memory_map=True):
+    if path.endswith(formats['parquet']):
+        import pyarrow.parquet
+        return pyarrow.parquet.read_table(
+            path, memory_map=memory_map).to_pandas()
+    if path.endswith(formats['feather']):
+        import pyarrow.feather
+        df = pyarrow.feather.read_table(
+            path, memory_map=memory_map).to_pandas()
+        return df.set_index(list(index_dtypes))
+    return pd.read_csv(path, index_col=list(range(len(index_dtypes))))
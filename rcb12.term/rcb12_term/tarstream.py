@@ -0,0 +1,65 @@
+import bz2
+import fnmatch
+import gzip
+import lzma
+import posixpath
+import tarfile
+
+# pickaxe/tarstream.py keeps a copy of the reader for the plots; keep the
+# two in step
+
+tar_suffixes = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz')
+
+# Members converted when no include globs are given
+default_include = ['*.txt', '*.txt.xz', '*.out']
+
+
+def is_tar(path):
+    return path.endswith(tar_suffixes)
+
+
+def strip_tar_suffix(path):
+    for suffix in tar_suffixes:
+        if path.endswith(suffix):
+            return path[:-len(suffix)]
+    return path
+
+
+def is_safe(name):
+    # Member names end up in output paths: absolute ones, or ones climbing
+    # out with .., would put outputs outside the output tree
+    return not posixpath.isabs(name) and \
+        '..' not in posixpath.normpath(name).split('/')
+
+
+def decompressed(handle, name):
+    # Members compressed on their own are decompressed as they are read
+    if name.endswith('.xz'):
+        return lzma.open(handle, 'rb')
+    if name.endswith('.gz'):
+        return gzip.open(handle, 'rb')
+    if name.endswith('.bz2'):
+        return bz2.open(handle, 'rb')
+    return handle
+
+
+def members(source, include=default_include, prefix=''):
+    # (name, binary stream) for every regular member matching one of the
+    # include globs, read straight out of the (compressed) archive in the
+    # order it was written; nothing is extracted. Each stream has to be
+    # read before the next member is asked for. Members of nested tars are
+    # named as if the nested tar had been extracted into a directory
+    if isinstance(source, str):
+        tar = tarfile.open(source, mode='r|*')
+    else:
+        tar = tarfile.open(fileobj=source, mode='r|*')
+    with tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            name = prefix + member.name
+            if is_tar(member.name):
+                yield from members(tar.extractfile(member), include,
+                                   strip_tar_suffix(name) + '/')
+            elif any(fnmatch.fnmatch(name, i) for i in include):
+                yield name, decompressed(tar.extractfile(member), member.name)
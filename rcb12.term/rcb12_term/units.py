@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+
+class unit_registry(object):
+    # Maps each HPX unit string to a scale factor and the canonical unit
+    # values are converted to
+    def __init__(self, units=()):
+        self.units = {}
+        for unit, scale, canonical in units:
+            self.register(unit, scale, canonical)
+
+    def register(self, unit, scale, canonical=None):
+        self.units[unit] = (float(scale), canonical or unit)
+
+    def copy(self):
+        return unit_registry(
+            (unit, scale, canonical)
+            for unit, (scale, canonical) in self.units.items())
+
+    def __contains__(self, unit):
+        return unit in self.units
+
+    def __repr__(self):
+        return 'unit_registry({})'.format(sorted(
+            (unit, scale, canonical)
+            for unit, (scale, canonical) in self.units.items()))
+
+    def factors(self, categories, dtype=np.float64):
+        # Scale factor per unit category, plus a trailing factor of 1 that
+        # rows without a unit (code -1) pick up; unknown units get NaN
+        return np.array(
+            [self.units[i][0] if i in self.units else np.nan
+             for i in categories] + [1.0],
+            dtype=dtype)
+
+    def normalize(self, values, value_unit, strict=True):
+        # One multiply by a per-unit-code factor; unless strict, values in
+        # unknown units become NaN and keep their unit
+        unit_codes = value_unit.codes
+        unknown = [i for i in value_unit.categories if i not in self.units]
+        if unknown and strict:
+            raise ValueError('Unknown unit(s): ' + ', '.join(unknown))
+
+        values *= self.factors(value_unit.categories, values.dtype)[unit_codes]
+
+        canonical_index, canonical = pd.factorize(np.array(
+            [self.units[i][1] if i in self.units else i
+             for i in value_unit.categories], dtype=object))
+        canonical_index = np.append(canonical_index, -1)
+        return pd.Categorical.from_codes(
+            canonical_index[unit_codes], canonical)
+
+
+def parse_unit(spec):
+    # UNIT=SCALE[:CANONICAL], e.g. [us]=1e-6:[s]
+    unit, _, rest = spec.partition('=')
+    scale, _, canonical = rest.partition(':')
+    if not unit or not scale:
+        raise ValueError('Expected UNIT=SCALE[:CANONICAL], got ' + spec)
+    return unit, float(scale), canonical or None
+
+
+default_units = unit_registry([
+    ('[s]', 1.0, '[s]'),
+    ('[ms]', 1.0e-3, '[s]'),
+    ('[us]', 1.0e-6, '[s]'),
+    ('[ns]', 1.0e-9, '[s]'),
+    ('[0.01%]', 0.01, '[%]'),
+    ('[%]', 1.0, '[%]'),
+    ('[B]', 1.0, '[B]'),
+    ('[1]', 1.0, '[1]'),
+])
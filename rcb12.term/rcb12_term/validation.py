@@ -0,0 +1,171 @@
+import warnings
+
+import numpy as np
+
+from .helpers import count_lines
+
+
+modes = ['strict', 'warn', 'off']
+
+# Checks run on every counter row, by bit in the fused failure mask
+row_checks = [
+    'missing value',
+    'missing timestamp',
+    'negative timestamp',
+    'unknown unit',
+    'idle rate out of range',
+]
+
+# Counter lines whose name the name tokenizer cannot read; their rows are
+# not in the frame, so they are counted apart from the row checks
+unparsed_check = 'unparsed counter name'
+
+# How many counter names and line numbers a report keeps per check
+max_examples = 5
+
+
+class validation_error(ValueError):
+    def __init__(self, report):
+        super().__init__(str(report))
+        self.report = report
+
+
+class check_failure(object):
+    def __init__(self):
+        self.rows = 0
+        self.counters = set()
+        self.lines = []
+
+
+class validation_report(object):
+    def __init__(self):
+        self.rows = 0
+        self.lines = 0
+        self.failures = {}
+
+    def fail(self, check, rows, counters=(), lines=()):
+        failure = self.failures.setdefault(check, check_failure())
+        failure.rows += rows
+        failure.counters.update(counters)
+        failure.lines = sorted(failure.lines + list(lines))[:max_examples]
+
+    def merge(self, other, line_offset=0):
+        # other covers the lines after the first line_offset lines
+        self.rows += other.rows
+        self.lines += other.lines
+        for check, failure in other.failures.items():
+            self.fail(check, failure.rows, failure.counters,
+                      [i + line_offset for i in failure.lines])
+
+    def __bool__(self):
+        return not self.failures
+
+    def __str__(self):
+        if not self.failures:
+            return 'Validated {:,} counter rows'.format(self.rows)
+        text = ['Validation failed ({:,} counter rows in {:,} lines):'.format(
+            self.rows, self.lines)]
+        for check, failure in self.failures.items():
+            text.append('  {}: {:,} rows'.format(check, failure.rows))
+            if failure.counters:
+                text.append('    counters: ' + ', '.join(
+                    sorted(failure.counters)[:max_examples]))
+            if failure.lines:
+                text.append('    first lines: ' + ', '.join(
+                    str(i) for i in failure.lines))
+        return '\n'.join(text)
+
+
+def check_rows(values, names, units):
+    # One uint8 mask with a bit per failed row check, built from vector
+    # operations over the columns without filtering the frame
+    value = values.value.to_numpy()
+    timestamp = values.timestamp.to_numpy()
+    value_unit = values.value_unit.array
+    unit_factors = units.factors(value_unit.categories)[value_unit.codes]
+    timestamp_unit = values.timestamp_unit.array
+    timestamp_factors = units.factors(
+        timestamp_unit.categories)[timestamp_unit.codes]
+
+    countername = np.array(
+        [i[4] for i in names.attributes] + [''], dtype=object)
+    is_idle_rate = (countername == 'idle-rate')[values.code.to_numpy()]
+    with np.errstate(invalid='ignore'):
+        idle_rate = value * unit_factors
+        out_of_range = is_idle_rate & ((idle_rate < 0) | (idle_rate > 100))
+
+    mask = np.zeros(len(values), dtype=np.uint8)
+    for bit, failed in enumerate([
+            np.isnan(value),
+            np.isnan(timestamp),
+            timestamp < 0,
+            np.isnan(unit_factors) | np.isnan(timestamp_factors),
+            out_of_range]):
+        mask |= failed.astype(np.uint8) << bit
+    return mask
+
+
+def line_numbers(hpx_out, tokenizer, ordinals):
+    # Slow path, only taken for failed rows: find the lines of the given
+    # (sorted) match ordinals
+    wanted = iter(ordinals)
+    ordinal = next(wanted, None)
+    lines = []
+    line = 1
+    position = 0
+    for i, m in enumerate(tokenizer.finditer(hpx_out)):
+        if ordinal is None:
+            break
+        if i == ordinal:
+            line += count_lines(hpx_out[position:m.start()])
+            position = m.start()
+            lines.append(line)
+            ordinal = next(wanted, None)
+    return lines
+
+
+def validate_rows(hpx_out, known, values, names, units, tokenizer,
+                  full_names):
+    report = validation_report()
+    report.rows = len(values)
+    report.lines = count_lines(hpx_out)
+
+    unparsed = np.flatnonzero(~known)
+    if unparsed.size:
+        report.fail(
+            unparsed_check, unparsed.size,
+            [i.decode('utf-8') if isinstance(i, bytes) else i
+             for i in np.unique(full_names[unparsed])],
+            line_numbers(hpx_out, tokenizer, unparsed[:max_examples]))
+
+    mask = check_rows(values, names, units)
+    if not mask.any():
+        return report
+
+    # Ordinal of every kept row among the tokenizer matches
+    ordinals = np.flatnonzero(known)
+    codes = values.code.to_numpy()
+    for bit, check in enumerate(row_checks):
+        rows = np.flatnonzero(mask & (1 << bit))
+        if rows.size:
+            report.fail(
+                check, rows.size,
+                [names.names[i] for i in np.unique(codes[rows])],
+                line_numbers(hpx_out, tokenizer, ordinals[rows[:max_examples]]))
+    return report
+
+
+def validate_table(df, report):
+    if 0 == len(df):
+        report.fail('no counters', 0)
+    elif not (df.objectname == 'octotiger').any():
+        report.fail('no octotiger counters', 0)
+    return report
+
+
+def finish(report, mode):
+    if mode == 'off' or report:
+        return
+    if mode == 'strict':
+        raise validation_error(report)
+    warnings.warn(str(report), stacklevel=2)
@@ -0,0 +1,72 @@
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+import rcb12_term.cache
+import rcb12_term.filters
+
+
+class parse_cache_test(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.cache = rcb12_term.cache.parse_cache(
+            os.path.join(self.dir, 'cache'))
+        self.input = os.path.join(self.dir, 'input.txt.xz')
+        with open(self.input, 'wb') as f:
+            f.write(b'input')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_round_trip(self):
+        key = self.cache.key(self.input)
+        self.assertIsNone(self.cache.get(key))
+
+        vdf = pd.DataFrame({'a': [1.5, 2.5]})
+        self.cache.put(key, vdf)
+        pd.testing.assert_frame_equal(self.cache.get(key), vdf)
+
+    def test_bad_entries_are_misses(self):
+        key = self.cache.key(self.input)
+        vdf = pd.DataFrame({'a': [1.5, 2.5]})
+        for content in [
+                b'not a pickle',
+                # Cut off
+                pickle.dumps(vdf)[:-20],
+                # Names something this pandas does not have
+                b'crcb12_term.cache\nno_such_thing\n.']:
+            with open(self.cache.path(key), 'wb') as f:
+                f.write(content)
+            self.assertIsNone(self.cache.get(key))
+            self.assertFalse(os.path.exists(self.cache.path(key)))
+
+    def test_key_depends_on_content_and_filter(self):
+        key = self.cache.key(self.input)
+        self.assertNotEqual(
+            key, self.cache.key(self.input, rcb12_term.filters.no_filter))
+
+        with open(self.input, 'ab') as f:
+            f.write(b'more')
+        self.assertNotEqual(key, self.cache.key(self.input))
+
+    def test_evicts_least_recently_used(self):
+        vdf = pd.DataFrame({'a': range(100)})
+        for i, key in enumerate(['a', 'b', 'c']):
+            self.cache.put(key, vdf)
+            os.utime(self.cache.path(key), (i, i))
+        self.cache.get('a')
+
+        self.cache.max_bytes = os.path.getsize(self.cache.path('a')) * 2
+        self.cache.evict()
+
+        self.assertIsNotNone(self.cache.get('a'))
+        self.assertIsNone(self.cache.get('b'))
+        self.assertIsNotNone(self.cache.get('c'))
+
+
+if __name__ == '__main__':
+    unittest.main()
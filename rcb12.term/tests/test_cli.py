@@ -0,0 +1,53 @@
+import contextlib
+import io
+import lzma
+import os
+import shutil
+import tempfile
+import unittest
+
+import rcb12_term.cli
+
+data_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+class run_test(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.journal_path = os.path.join(self.dir.name, 'journal.jsonl')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def run_batch(self, **kwargs):
+        printed = io.StringIO()
+        with contextlib.redirect_stdout(printed), \
+                contextlib.redirect_stderr(io.StringIO()):
+            rcb12_term.cli.run(
+                executor='thread', jobs=1, roots=[self.dir.name],
+                journal_path=self.journal_path, **kwargs)
+        return printed.getvalue()
+
+    def test_same_output(self):
+        # 1.txt and 1.txt.xz both convert to 1.csv: only one of them is
+        # converted, and the output stays up to date afterwards
+        source = os.path.join(self.dir.name, '1.txt')
+        shutil.copy(os.path.join(data_dir, '64_1.txt'), source)
+        with open(source, 'rb') as f, \
+                lzma.open(source + '.xz', 'wb', preset=0) as xz:
+            xz.write(f.read())
+
+        printed = self.run_batch(patterns=['*.txt', '*.txt.xz'])
+        self.assertIn('Skipping {}.xz: {} is converted to the same'.format(
+            source, source), printed)
+        with open(os.path.join(data_dir, '64_1.csv'), 'rb') as f, \
+                open(os.path.join(self.dir.name, '1.csv'), 'rb') as g:
+            self.assertEqual(f.read(), g.read())
+
+        printed = self.run_batch(patterns=['*.txt', '*.txt.xz'],
+                                 dry_run=True)
+        self.assertIn('0 file(s) to convert, 1 up to date', printed)
+
+
+if __name__ == '__main__':
+    unittest.main()
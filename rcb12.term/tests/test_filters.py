@@ -0,0 +1,39 @@
+import unittest
+
+import rcb12_term.filters
+
+
+subject = '''
+/agas{locality#1/total}/time/route,1,27.941827,[s],0,[ns]
+/octotiger{locality#0/total}/subgrid_leaves,2,3602.438779,[s],32428
+/threads{locality#0/pool#default/worker-thread#3}/idle-rate,2,3602.43,[s],9955,[0.01%]
+/threads{locality#0/pool#default/worker-thread#3}/count/cumulative,2,3602.4,[s],1375
+/threads{locality#0/pool#default/worker-thread#3}/count/cumulative-phases,2,3602.4,[s],1
+/threads{locality#0/total/total}/count/cumulative-foo,2,3602.4,[s],17
+'''
+
+
+class counter_filter_test(unittest.TestCase):
+    def get_actual(self, counter_filter):
+        return [i[0] for i in counter_filter.tokenizer.findall(subject)]
+
+    def test_no_filter(self):
+        self.assertEqual(len(self.get_actual(rcb12_term.filters.no_filter)), 6)
+
+    def test_default_filter(self):
+        self.assertEqual(self.get_actual(rcb12_term.filters.default_filter), [
+            '/octotiger{locality#0/total}/subgrid_leaves',
+            '/threads{locality#0/pool#default/worker-thread#3}/idle-rate',
+            '/threads{locality#0/total/total}/count/cumulative-foo',
+        ])
+
+    def test_include(self):
+        counter_filter = rcb12_term.filters.counter_filter(
+            include_objects=['threads'], include_counters=['idle-rate'])
+        self.assertEqual(self.get_actual(counter_filter), [
+            '/threads{locality#0/pool#default/worker-thread#3}/idle-rate',
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import io
+import os
+import tempfile
+import unittest
+
+import rcb12_term.follow
+
+data_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+class follow_test(unittest.TestCase):
+    def setUp(self):
+        with open(os.path.join(data_dir, '64_1.txt'), 'rb') as f:
+            self.hpx_out = f.read()
+        with open(os.path.join(data_dir, '64_1.csv'), encoding='utf-8') as f:
+            self.expected = f.read()
+
+    def test_emits_completed_iterations(self):
+        f = rcb12_term.follow.follower()
+        actual = io.StringIO()
+        emitted = []
+        # Odd sized pieces cut lines in half
+        for start in range(0, len(self.hpx_out), 100003):
+            vdf = f.feed(self.hpx_out[start:start + 100003])
+            if vdf is not None:
+                emitted.append(list(vdf.index.unique('iteration')))
+                vdf.to_csv(actual, header=len(emitted) == 1,
+                           float_format='%g')
+        vdf = f.close()
+        if vdf is not None:
+            emitted.append(list(vdf.index.unique('iteration')))
+            vdf.to_csv(actual, header=False, float_format='%g')
+
+        self.assertEqual(sum(emitted, []), [1, 2, 3, 4])
+        # The last iteration is emitted as soon as all its counters are in
+        self.assertIsNone(vdf)
+        self.assertEqual(actual.getvalue(), self.expected)
+
+    def test_follow_file(self):
+        with tempfile.TemporaryDirectory() as d:
+            source = os.path.join(d, 'run.txt')
+            output = os.path.join(d, 'run.csv')
+            with open(source, 'wb') as f:
+                f.write(self.hpx_out)
+            rcb12_term.follow.follow(
+                source, output, poll_interval=0.01, idle_timeout=0.05,
+                show_progress=False)
+            with open(output, encoding='utf-8') as f:
+                self.assertEqual(f.read(), self.expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
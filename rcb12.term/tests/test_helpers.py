@@ -0,0 +1,142 @@
+import concurrent.futures
+import lzma
+import os
+import pickle
+import tempfile
+import threading
+import time
+import unittest
+
+import rcb12_term.helpers
+
+
+class read_file_chunks_test(unittest.TestCase):
+    def setUp(self):
+        self.lines = [
+            '/octotiger{locality#%d/total}/subgrids,%d,3602.438779,[s],%d\n'
+            % (i % 64, i // 64, i) for i in range(1000)]
+        handle, self.path = tempfile.mkstemp(suffix='.txt.xz')
+        os.close(handle)
+        with lzma.open(self.path, 'wt', encoding='utf-8') as f:
+            f.write(''.join(self.lines))
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_chunks_are_line_aligned(self):
+        chunks = list(rcb12_term.helpers.read_file_chunks(self.path, 100))
+
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertTrue(chunk.endswith(b'\n'))
+        self.assertEqual(b''.join(chunks).decode(), ''.join(self.lines))
+        self.assertEqual(b''.join(chunks).decode(),
+                         rcb12_term.helpers.read_file(self.path))
+
+    def test_mapped_chunks(self):
+        path = self.path[:-3]
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(''.join(self.lines))
+        self.addCleanup(os.remove, path)
+
+        chunks = list(rcb12_term.helpers.read_file_chunks(path, 100))
+
+        self.assertGreater(len(chunks), 1)
+        views = [bytes(i.view()) for i in chunks]
+        for chunk in views:
+            self.assertTrue(chunk.endswith(b'\n'))
+        self.assertEqual(b''.join(views).decode(), ''.join(self.lines))
+        # Only the range is pickled; the mapping is opened again
+        copy = pickle.loads(pickle.dumps(chunks[1]))
+        self.assertIsNone(copy.mapping)
+        self.assertEqual(bytes(copy.view()), views[1])
+
+
+class split_lines_test(unittest.TestCase):
+    def test_shards_are_line_aligned(self):
+        text = 'a\nbb\nccc\ndddd\neeeee'
+        for count in range(1, 8):
+            shards = rcb12_term.helpers.split_lines(text, count)
+            self.assertLessEqual(len(shards), count)
+            self.assertEqual(''.join(shards), text)
+            for shard in shards[:-1]:
+                self.assertTrue(shard.endswith('\n'))
+
+
+class map_bounded_test(unittest.TestCase):
+    def test_shared_window(self):
+        # Three threads mapping at once never have more than the shared
+        # window of tasks in flight between them
+        window = threading.BoundedSemaphore(3)
+        lock = threading.Lock()
+        in_flight = [0, 0]
+
+        def task(item):
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight)
+            time.sleep(0.001)
+            with lock:
+                in_flight[0] -= 1
+            return item * 2
+
+        def mapped(count):
+            return list(rcb12_term.helpers.map_bounded(
+                pool, task, range(count), window))
+
+        with concurrent.futures.ThreadPoolExecutor(8) as pool, \
+                concurrent.futures.ThreadPoolExecutor(3) as threads:
+            results = list(threads.map(mapped, [20, 30, 40]))
+        self.assertEqual(results, [[2 * i for i in range(count)]
+                                   for count in [20, 30, 40]])
+        self.assertLessEqual(in_flight[1], 3)
+        # Every slot was given back
+        for _ in range(3):
+            self.assertTrue(window.acquire(blocking=False))
+
+
+class find_input_files_test(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        for path in ['short_runs/cori/1.txt.xz', 'short_runs/cori/1.txt',
+                     'long_runs/apr16/level_13/2.txt.xz',
+                     'long_runs/apr16/level_14/3.txt.xz']:
+            path = os.path.join(self.dir.name, path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            open(path, 'w').close()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def relative(self, paths):
+        return sorted(os.path.relpath(i, self.dir.name) for i in paths)
+
+    def test_roots(self):
+        root = self.dir.name
+        files, base = rcb12_term.helpers.find_input_files(
+            [os.path.join(root, 'short_runs', 'cori'),
+             os.path.join(root, 'long_runs', '*', 'level_*'),
+             os.path.join(root, 'short_runs', 'cori', '1.txt.xz')])
+        self.assertEqual(self.relative(files), [
+            'long_runs/apr16/level_13/2.txt.xz',
+            'long_runs/apr16/level_14/3.txt.xz',
+            'short_runs/cori/1.txt.xz'])
+        self.assertEqual(base, root)
+
+        files, _ = rcb12_term.helpers.find_input_files(
+            [os.path.join(root, 'short_runs')], ['*.txt', '*.txt.xz', '*.txt*'],
+            recursive=True)
+        self.assertEqual(self.relative(files), [
+            'short_runs/cori/1.txt', 'short_runs/cori/1.txt.xz'])
+
+        files, base = rcb12_term.helpers.find_input_files(
+            [os.path.join(root, 'long_runs')], recursive=True)
+        self.assertEqual(len(files), 2)
+        self.assertEqual(
+            rcb12_term.helpers.get_mirrored_output_path(
+                files[0], base, 'out', '.csv'),
+            os.path.join('out', 'apr16', 'level_13', '2.csv'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import lzma
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+import rcb12_term.cli
+import rcb12_term.journal
+
+data_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+class journal_test(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_record_and_reload(self):
+        path = os.path.join(self.dir.name, 'batch', 'journal.jsonl')
+        batch = rcb12_term.journal.journal(path)
+        batch.record('a.txt.xz', 'failed', 'a.csv', error='EOFError: cut')
+        batch.record('b.txt.xz', 'done', 'b.csv', 1.5)
+        batch.record('a.txt.xz', 'salvaged', 'a.csv', 2.0, 'cut off')
+        # A batch killed while writing a line
+        with open(path, 'a') as f:
+            f.write('{"input": "c.txt')
+
+        batch = rcb12_term.journal.journal(path)
+        self.assertEqual(batch.status('a.txt.xz'), 'salvaged')
+        self.assertEqual(batch.status('b.txt.xz'), 'done')
+        self.assertIsNone(batch.status('c.txt.xz'))
+        self.assertEqual(
+            batch.summary(['a.txt.xz', 'b.txt.xz', 'c.txt.xz']),
+            '1 done, 1 salvaged, 0 failed')
+
+    def test_salvage(self):
+        with open(os.path.join(data_dir, '64_1.txt'), encoding='utf-8') as f:
+            hpx_out = f.read()
+        # Written up to the end of iteration 3, then cut off a little
+        # before that
+        end = hpx_out.index('\n', hpx_out.rindex('idle-rate,3,')) + 1
+        data = lzma.compress(hpx_out[:end].encode('utf-8'), preset=0)
+        source = os.path.join(self.dir.name, 'cut.txt.xz')
+        with open(source, 'wb') as f:
+            f.write(data[:-100])
+
+        with self.assertRaises(EOFError):
+            rcb12_term.cli.convert_file(source, show_progress=False)
+
+        of, _, note = rcb12_term.cli.convert_file(
+            source, show_progress=False, salvage=True)
+        self.assertIn('dropped incomplete iteration 3', note)
+        vdf = pd.read_csv(of, index_col=[0, 1])
+        self.assertEqual(list(vdf.index.unique('iteration')), [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+
+import numpy as np
+
+import rcb12_term.names
+import rcb12_term.schema
+
+
+class counter_name_table_test(unittest.TestCase):
+    def test_intern_parses_each_name_once(self):
+        names = rcb12_term.names.counter_name_table()
+        idle_rate = '/threads{locality#3/pool#default/worker-thread#7}/idle-rate'
+        subgrids = '/octotiger{locality#3/total}/subgrids'
+
+        codes = names.intern(np.array(
+            [idle_rate, subgrids, idle_rate, 'not a counter', subgrids],
+            dtype=object))
+        more_codes = names.intern(np.array([subgrids], dtype=object))
+
+        self.assertEqual(list(codes), [0, 1, 0, -1, 1])
+        self.assertEqual(list(more_codes), [1])
+        self.assertEqual(len(names), 2)
+
+        df = names.frame(codes[codes >= 0])
+        self.assertEqual(list(df.objectname),
+                         ['threads', 'octotiger', 'threads', 'octotiger'])
+        self.assertEqual(df.countername.dtype, 'category')
+        self.assertEqual(list(df.locality), [3] * 4)
+        self.assertEqual(df.locality.dtype, np.uint16)
+        no_thread = rcb12_term.schema.no_thread
+        self.assertEqual(list(df.thread_id), [7, no_thread, 7, no_thread])
+        self.assertEqual(df.thread_id.dtype, np.uint8)
+
+    def test_out_of_range(self):
+        names = rcb12_term.names.counter_name_table()
+        names.code('/threads{locality#65535/pool#default/worker-thread#254}'
+                   '/idle-rate')
+        for name in [
+                '/octotiger{locality#65536/total}/subgrids',
+                '/threads{locality#0/pool#default/worker-thread#255}'
+                '/idle-rate']:
+            with self.assertRaises(ValueError):
+                names.code(name)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -72,6 +72,44 @@ class main_test(unittest.TestCase):
 
         self.assertEqual(get_actual(subject), expected)
 
+    def test_counter_line_tokenizer(self):
+        pattern = rcb12_term.patterns.get_counter_line_tokenizer()
+
+        subject = '''
+Checking node qb023 10:03:19
+/threads{locality#0/pool#default/worker-thread#3}/idle-rate,2,3602.43,[s],9955,[0.01%]
+/threads{locality#12/total/total}/count/cumulative,44,154828.18,[s],2.28135e+09
+/agas{locality#1/total}/time/route,1,27.941827,[s],0,[ns]
+'''
+        expected = [
+            ('/threads{locality#0/pool#default/worker-thread#3}/idle-rate',
+             '2', '3602.43', '[s]', '9955', '[0.01%]'),
+            ('/threads{locality#12/total/total}/count/cumulative',
+             '44', '154828.18', '[s]', '2.28135e+09', ''),
+            ('/agas{locality#1/total}/time/route',
+             '1', '27.941827', '[s]', '0', '[ns]'),
+        ]
+
+        self.assertEqual(pattern.findall(subject), expected)
+
+    def test_counter_name_tokenizer(self):
+        pattern = rcb12_term.patterns.get_counter_name_tokenizer()
+
+        def get_actual(subject):
+            m = pattern.match(subject)
+            self.assertIsNotNone(m)
+            return m.groups()
+
+        self.assertEqual(
+            ('threads', '0', 'pool#default/worker-thread#3', '3', 'idle-rate'),
+            get_actual('/threads{locality#0/pool#default/worker-thread#3}/idle-rate'))
+        self.assertEqual(
+            ('threads', '12', 'total/total', None, 'count/cumulative'),
+            get_actual('/threads{locality#12/total/total}/count/cumulative'))
+        self.assertEqual(
+            ('octotiger', '5', 'total', None, 'subgrid_leaves'),
+            get_actual('/octotiger{locality#5/total}/subgrid_leaves'))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,65 @@
+import io
+import os
+import unittest
+
+import pandas as pd
+from tqdm import tqdm
+
+import rcb12_term.filters
+import rcb12_term.helpers
+import rcb12_term.process
+
+data_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+class process_file_test(unittest.TestCase):
+    def setUp(self):
+        with open(os.path.join(data_dir, '64_1.txt'), encoding='utf-8') as f:
+            self.hpx_out = f.read()
+        with open(os.path.join(data_dir, '64_1.csv'), encoding='utf-8') as f:
+            self.expected = f.read()
+
+    def get_actual(self, **kwargs):
+        vdf = rcb12_term.process.process_file(
+            self.hpx_out, tqdm(disable=True), **kwargs)
+
+        actual = io.StringIO()
+        vdf.to_csv(actual, float_format='%g')
+        return actual.getvalue()
+
+    def test_matches_committed_csv(self):
+        self.assertEqual(self.get_actual(), self.expected)
+
+    def test_shards(self):
+        self.assertEqual(self.get_actual(shards=3), self.expected)
+
+    def test_bytes(self):
+        self.hpx_out = self.hpx_out.encode('utf-8')
+        self.assertEqual(self.get_actual(), self.expected)
+        self.assertEqual(self.get_actual(shards=3), self.expected)
+
+    def test_mapped(self):
+        # Shards of a mapping reach the worker processes as ranges
+        self.hpx_out = rcb12_term.helpers.map_file(
+            os.path.join(data_dir, '64_1.txt'))
+        self.assertEqual(self.get_actual(), self.expected)
+        self.assertEqual(self.get_actual(shards=3), self.expected)
+
+    def test_no_filter(self):
+        # Other per-thread counters get columns of their own instead of
+        # being averaged into the idle rate columns
+        vdf = rcb12_term.process.process_file(
+            self.hpx_out, tqdm(disable=True),
+            rcb12_term.filters.no_filter)
+        expected = pd.read_csv(io.StringIO(self.expected), index_col=[0, 1])
+        threads = [str(float(i)) for i in range(20)]
+        vdf.columns = [str(i) for i in vdf.columns]
+        pd.testing.assert_frame_equal(
+            vdf[threads], expected[threads], check_dtype=False,
+            check_index_type=False, atol=0.005)
+        self.assertIn('count/cumulative#0', vdf.columns)
+        self.assertTrue(vdf['count/cumulative#0'].notna().any())
+
+
+if __name__ == '__main__':
+    unittest.main()
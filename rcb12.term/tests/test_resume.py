@@ -0,0 +1,122 @@
+import json
+import lzma
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+import rcb12_term.cli
+import rcb12_term.filters
+import rcb12_term.resume
+import rcb12_term.schema
+import rcb12_term.storage
+
+data_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+class resume_test(unittest.TestCase):
+    def setUp(self):
+        with open(os.path.join(data_dir, '64_1.txt'), encoding='utf-8') as f:
+            self.hpx_out = f.read()
+        with open(os.path.join(data_dir, '64_1.csv'), encoding='utf-8') as f:
+            self.expected = f.read()
+        self.dir = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.dir.name, 'run.txt.xz')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def convert(self, hpx_out, output_format='csv'):
+        with lzma.open(self.source, 'wt', encoding='utf-8', preset=0) as f:
+            f.write(hpx_out)
+        of, _, _ = rcb12_term.cli.convert_file(
+            self.source, show_progress=False, chunk_size=2 ** 18,
+            output_format=output_format)
+        with open(rcb12_term.resume.meta_path(of)) as f:
+            return of, json.load(f)
+
+    def test_append_csv(self):
+        # A run killed in the middle of iteration 3, then restarted
+        cut = self.hpx_out.index(
+            '\n', self.hpx_out.index('/threads{locality#9/total/total}'
+                                     '/idle-rate,3,'))
+        of, meta = self.convert(self.hpx_out[:cut + 1])
+        self.assertEqual(meta['last_iteration'], 3)
+
+        of, resumed = self.convert(self.hpx_out)
+        self.assertEqual(resumed['last_iteration'], 4)
+        self.assertGreater(resumed['offset'], meta['offset'])
+        with open(of, encoding='utf-8') as f:
+            self.assertEqual(f.read(), self.expected)
+
+    def test_append_nothing(self):
+        # Cut off in iteration 3's AGAS block, then grown only by lines
+        # the filter drops: there is nothing to append
+        cut = self.hpx_out.index('\n', self.hpx_out.index(
+            '/threads{locality#19/pool#default/worker-thread#15}'
+            '/count/cumulative-phases,3,'))
+        of, meta = self.convert(self.hpx_out[:cut + 1])
+        with open(of, encoding='utf-8') as f:
+            converted = f.read()
+
+        of, resumed = self.convert(
+            self.hpx_out[:cut + 1] + '/agas{locality#0/total}/count/bind,3,'
+            '7229.1,[s],12\n')
+        self.assertEqual(resumed['offset'], meta['offset'])
+        self.assertNotEqual(resumed['input'], meta['input'])
+        with open(of, encoding='utf-8') as f:
+            self.assertEqual(f.read(), converted)
+
+    def test_other_run(self):
+        of, meta = self.convert(self.hpx_out[:len(self.hpx_out) // 2])
+        # Starts out differently, so it is converted from scratch
+        of, meta = self.convert('#\n' + self.hpx_out)
+        self.assertEqual(meta['last_iteration'], 4)
+        with open(of, encoding='utf-8') as f:
+            self.assertEqual(f.read(), self.expected)
+
+    def test_append_parquet(self):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            self.skipTest('pyarrow is not installed')
+
+        cut = self.hpx_out.index('/octotiger{locality#0/total}/subgrids,4,')
+        self.convert(self.hpx_out[:cut], 'parquet')
+        of, meta = self.convert(self.hpx_out, 'parquet')
+        self.assertEqual(meta['last_iteration'], 4)
+        resumed = rcb12_term.storage.load(of)
+
+        rcb12_term.cli.convert_file(
+            self.source, show_progress=False, output_format='parquet',
+            incremental=False)
+        pd.testing.assert_frame_equal(resumed, rcb12_term.storage.load(of))
+
+    def test_staleness(self):
+        config = rcb12_term.resume.config_digest(
+            rcb12_term.filters.default_filter,
+            rcb12_term.schema.default_schema, 'csv')
+        of, _ = self.convert(self.hpx_out)
+        self.assertIsNone(
+            rcb12_term.resume.staleness(self.source, of, config))
+        self.assertIsNotNone(rcb12_term.resume.staleness(
+            self.source, of, rcb12_term.resume.config_digest(
+                rcb12_term.filters.no_filter,
+                rcb12_term.schema.default_schema, 'csv')))
+
+        stat = os.stat(self.source)
+        os.utime(self.source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertEqual(
+            rcb12_term.resume.staleness(self.source, of, config),
+            'input is newer')
+
+        os.utime(self.source, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        os.remove(rcb12_term.resume.meta_path(of))
+        self.assertEqual(
+            rcb12_term.resume.staleness(self.source, of, config),
+            'not stamped')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import rcb12_term.cli
+import rcb12_term.schedule
+
+
+def spin(seconds):
+    started = time.process_time()
+    while time.process_time() - started < seconds:
+        pass
+    return seconds
+
+
+class schedule_test(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.files = []
+        for name, size in [('small', 10), ('huge', 1000), ('medium', 100)]:
+            path = os.path.join(self.dir, name + '.txt.xz')
+            with open(path, 'wb') as f:
+                f.write(b'\0' * size)
+            self.files.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def names(self, paths):
+        return [os.path.basename(i).split('.')[0] for i in paths]
+
+    def test_longest_first(self):
+        split, whole = rcb12_term.schedule.schedule(self.files, 1)
+        self.assertEqual(split, [])
+        self.assertEqual(self.names(whole), ['huge', 'medium', 'small'])
+
+    def test_split_files_larger_than_fair_share(self):
+        split, whole = rcb12_term.schedule.schedule(self.files, 4)
+        self.assertEqual(self.names(split), ['huge'])
+        self.assertEqual(self.names(whole), ['medium', 'small'])
+
+    def test_split_all(self):
+        split, whole = rcb12_term.schedule.schedule(self.files, 4, True)
+        self.assertEqual(self.names(split), ['huge', 'medium', 'small'])
+        self.assertEqual(whole, [])
+
+
+class utilization_test(unittest.TestCase):
+    def test_process_workers(self):
+        # Workers of the process pool are not children of this process;
+        # their CPU time comes back with their results
+        usage = rcb12_term.schedule.utilization(2)
+        if usage.cpu is None:
+            self.skipTest('getrusage is not available')
+        with rcb12_term.cli.executors['process'](2) as pool:
+            results = list(rcb12_term.schedule.untimed(pool.map(
+                rcb12_term.schedule.timed(spin), [0.2, 0.2])))
+        usage.stop()
+        self.assertEqual(results, [0.2, 0.2])
+        self.assertGreaterEqual(usage.cpu, 0.4)
+
+
+if __name__ == '__main__':
+    unittest.main()
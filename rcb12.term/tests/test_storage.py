@@ -0,0 +1,53 @@
+import importlib.util
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import rcb12_term.storage
+
+has_pyarrow = importlib.util.find_spec('pyarrow') is not None
+
+
+class storage_test(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.vdf = pd.DataFrame(
+            {'subgrids': [10.0, 12.0, 14.0, 16.0],
+             0.0: [99.5, 98.25, 97.0, 96.75],
+             1.0: [1.5, np.nan, 3.0, 4.0]},
+            index=pd.MultiIndex.from_product(
+                [[1, 2], [0, 1]], names=['iteration', 'locality']))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def round_trip(self, fmt):
+        path = os.path.join(
+            self.dir, 'out' + rcb12_term.storage.formats[fmt])
+        rcb12_term.storage.write(self.vdf, path, fmt)
+        return rcb12_term.storage.load(path)
+
+    def test_csv(self):
+        df = self.round_trip('csv')
+        self.assertEqual(list(df.columns), ['subgrids', '0.0', '1.0'])
+        np.testing.assert_array_equal(df.to_numpy(), self.vdf.to_numpy())
+
+    @unittest.skipUnless(has_pyarrow, 'pyarrow is not installed')
+    def test_columnar_formats(self):
+        for fmt in ['parquet', 'feather']:
+            df = self.round_trip(fmt)
+            self.assertEqual(list(df.index.names), ['iteration', 'locality'])
+            self.assertEqual(df.index.get_level_values(0).dtype, np.uint32)
+            self.assertEqual(df.index.get_level_values(1).dtype, np.uint16)
+            self.assertEqual(list(df.columns), ['subgrids', '0.0', '1.0'])
+            self.assertEqual(df['subgrids'].dtype, np.float64)
+            self.assertEqual(df['0.0'].dtype, np.float32)
+            np.testing.assert_array_equal(df.to_numpy(), self.vdf.to_numpy())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import contextlib
+import io
+import lzma
+import os
+import tarfile
+import tempfile
+import unittest
+
+import rcb12_term.cli
+import rcb12_term.filters
+import rcb12_term.resume
+import rcb12_term.schema
+import rcb12_term.tarstream
+
+data_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def add_member(tar, name, data):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    tar.addfile(info, io.BytesIO(data))
+
+
+class tarstream_test(unittest.TestCase):
+    def setUp(self):
+        with open(os.path.join(data_dir, '64_1.txt'), 'rb') as f:
+            self.hpx_out = f.read()
+        with open(os.path.join(data_dir, '64_1.csv'), 'rb') as f:
+            self.expected = f.read()
+
+        self.dir = tempfile.TemporaryDirectory()
+        nested = io.BytesIO()
+        with tarfile.open(fileobj=nested, mode='w') as tar:
+            add_member(tar, 'a/1.out', self.hpx_out)
+            add_member(tar, 'a/notes.md', b'notes')
+            add_member(tar, 'b/2.txt.xz', lzma.compress(self.hpx_out, preset=0))
+        self.path = os.path.join(self.dir.name, 'runs.tar.gz')
+        with tarfile.open(self.path, mode='w:gz') as tar:
+            add_member(tar, 'run/64_1.txt', self.hpx_out)
+            add_member(tar, 'run/nested.tar', nested.getvalue())
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_members(self):
+        names = []
+        for name, handle in rcb12_term.tarstream.members(self.path):
+            self.assertEqual(handle.read(), self.hpx_out)
+            names.append(name)
+        self.assertEqual(names, [
+            'run/64_1.txt', 'run/nested/a/1.out', 'run/nested/b/2.txt.xz'])
+
+        names = [name for name, _ in rcb12_term.tarstream.members(
+            self.path, ['*/a/*'])]
+        self.assertEqual(names, ['run/nested/a/1.out', 'run/nested/a/notes.md'])
+
+    def test_convert_archive(self):
+        def output_path(name):
+            return os.path.join(self.dir.name, name + '.csv')
+
+        converted = list(rcb12_term.cli.convert_archive(
+            self.path, output_path, ['*.out']))
+
+        self.assertEqual([i[0] for i in converted],
+                         [os.path.join(self.path, 'run/nested/a/1.out')])
+        self.assertIsNone(converted[0][3])
+        with open(converted[0][1], 'rb') as f:
+            self.assertEqual(f.read(), self.expected)
+        # Up to date until the archive changes
+        self.assertEqual(list(rcb12_term.cli.convert_archive(
+            self.path, output_path, ['*.out'])), [])
+
+    def test_archive_stamp(self):
+        journal_path = os.path.join(self.dir.name, 'journal.jsonl')
+
+        def run(**kwargs):
+            printed = io.StringIO()
+            with contextlib.redirect_stdout(printed), \
+                    contextlib.redirect_stderr(io.StringIO()):
+                rcb12_term.cli.run(
+                    executor='thread', jobs=1, roots=[self.dir.name],
+                    patterns=['*.tar.gz'], journal_path=journal_path,
+                    include=['*.out'], **kwargs)
+            return printed.getvalue()
+
+        run()
+        of = os.path.join(self.dir.name, 'runs', 'run', 'nested', 'a', '1.csv')
+        with open(of, 'rb') as f:
+            self.assertEqual(f.read(), self.expected)
+
+        # Unchanged archives are not read again: garbage of the same size
+        # and time would not even open
+        stat = os.stat(self.path)
+        with open(self.path, 'wb') as f:
+            f.write(b'\0' * stat.st_size)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertIn('0 file(s) to convert, 1 up to date',
+                      run(dry_run=True))
+        self.assertIn('All 1 output(s) are up to date', run())
+
+        # Other include globs are another member list
+        self.assertIsNone(rcb12_term.resume.archive_members(
+            os.path.join(self.dir.name, 'runs'),
+            rcb12_term.resume.config_digest(
+                rcb12_term.filters.default_filter,
+                rcb12_term.schema.default_schema, 'csv'),
+            self.path, ['*.txt']))
+
+    def test_unsafe_member_names(self):
+        path = os.path.join(self.dir.name, 'unsafe.tar')
+        with tarfile.open(path, mode='w') as tar:
+            add_member(tar, '../../x.out', self.hpx_out)
+            add_member(tar, '/abs/x.out', self.hpx_out)
+            add_member(tar, 'run/../../x.out', self.hpx_out)
+            add_member(tar, 'run/./x.out', self.hpx_out)
+
+        def output_path(name):
+            return os.path.join(self.dir.name, 'out', name + '.csv')
+
+        converted = list(rcb12_term.cli.convert_archive(
+            path, output_path, ['*.out']))
+        self.assertEqual([i[1] is None for i in converted],
+                         [True, True, True, False])
+        for _, of, _, error in converted[:3]:
+            self.assertIsInstance(error, ValueError)
+        self.assertIsNone(converted[3][3])
+        self.assertTrue(converted[3][1].startswith(
+            os.path.join(self.dir.name, 'out')))
+        self.assertFalse(os.path.exists(os.path.join(
+            os.path.dirname(self.dir.name), 'x.out.csv')))
+        self.assertFalse(os.path.exists('/abs/x.out.csv'))
+
+
+if __name__ == '__main__':
+    unittest.main()
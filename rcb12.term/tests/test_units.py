@@ -0,0 +1,36 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import rcb12_term.units
+
+
+class unit_registry_test(unittest.TestCase):
+    def test_normalize(self):
+        units = rcb12_term.units.default_units
+        values = np.array([9955.0, 2.0e9, 3.0, 4.0, 5.0e3])
+        value_unit = pd.Categorical(['[0.01%]', '[ns]', None, '[s]', '[us]'])
+
+        canonical = units.normalize(values, value_unit)
+
+        np.testing.assert_allclose(values, [99.55, 2.0, 3.0, 4.0, 5.0e-3])
+        self.assertEqual(
+            list(canonical.astype(object)), ['[%]', '[s]', np.nan, '[s]', '[s]'])
+
+    def test_unknown_unit(self):
+        units = rcb12_term.units.default_units
+        with self.assertRaises(ValueError):
+            units.normalize(np.array([1.0]), pd.Categorical(['[furlong]']))
+
+        units = units.copy()
+        units.register(*rcb12_term.units.parse_unit('[furlong]=201.168:[m]'))
+        values = np.array([1.0])
+        canonical = units.normalize(values, pd.Categorical(['[furlong]']))
+        self.assertEqual(list(values), [201.168])
+        self.assertEqual(list(canonical), ['[m]'])
+        self.assertNotIn('[furlong]', rcb12_term.units.default_units)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import concurrent.futures
+import os
+import unittest
+import warnings
+
+from tqdm import tqdm
+
+import rcb12_term.process
+import rcb12_term.validation
+
+data_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+class validation_test(unittest.TestCase):
+    def setUp(self):
+        with open(os.path.join(data_dir, '64_1.txt'), encoding='utf-8') as f:
+            self.lines = f.read().splitlines(keepends=True)
+
+    def corrupt(self, line, old, new):
+        self.assertIn(old, self.lines[line - 1])
+        self.lines[line - 1] = self.lines[line - 1].replace(old, new)
+
+    def process(self, **kwargs):
+        return rcb12_term.process.process_file(
+            ''.join(self.lines), tqdm(disable=True), **kwargs)
+
+    def test_strict(self):
+        self.corrupt(5956, '9952,[0.01%]', '19952,[0.01%]')
+        self.corrupt(5957, '[s],9999', '[s],-9999')
+        self.corrupt(5767, '[s]', '[furlong]')
+
+        for shards in [1, 3]:
+            with self.assertRaises(
+                    rcb12_term.validation.validation_error) as cm:
+                self.process(shards=shards)
+            failures = cm.exception.report.failures
+            self.assertEqual(
+                sorted(failures),
+                ['idle rate out of range', 'unknown unit'])
+            self.assertEqual(
+                failures['idle rate out of range'].lines, [5956, 5957])
+            self.assertEqual(
+                failures['idle rate out of range'].counters,
+                {'/threads{locality#0/total/total}/idle-rate',
+                 '/threads{locality#1/total/total}/idle-rate'})
+            self.assertEqual(failures['unknown unit'].lines, [5767])
+
+    def test_warn_and_off(self):
+        self.corrupt(5956, '9952,[0.01%]', '19952,[0.01%]')
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            self.process(validation_mode='warn')
+        self.assertEqual(len(caught), 1)
+        self.assertIn('idle rate out of range', str(caught[0].message))
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            self.process(validation_mode='off')
+
+    def test_malformed_value_and_unknown_unit(self):
+        self.corrupt(5957, '[s],9999', '[s],abc')
+        self.corrupt(5767, '[s]', '[furlong]')
+
+        with self.assertRaises(rcb12_term.validation.validation_error) as cm:
+            self.process()
+        failures = cm.exception.report.failures
+        self.assertEqual(sorted(failures), ['missing value', 'unknown unit'])
+        self.assertEqual(failures['missing value'].lines, [5957])
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            self.process(validation_mode='warn')
+        self.assertEqual(len(caught), 1)
+        self.process(validation_mode='off')
+
+    def test_no_octotiger_counters(self):
+        self.lines = [i for i in self.lines if not i.startswith('/octotiger')]
+        with self.assertRaises(rcb12_term.validation.validation_error):
+            self.process()
+
+    def test_unparsed_counter_name(self):
+        self.lines.insert(
+            5957, '/statistics{/threads{locality#0/total}/idle-rate}'
+                  '/average@100,4,7229.5,[s],9950,[0.01%]\n')
+
+        for shards in [1, 3]:
+            with self.assertRaises(
+                    rcb12_term.validation.validation_error) as cm:
+                self.process(shards=shards)
+            failure = cm.exception.report.failures['unparsed counter name']
+            self.assertEqual(failure.rows, 1)
+            self.assertEqual(failure.lines, [5958])
+            self.assertEqual(failure.counters, {
+                '/statistics{/threads{locality#0/total}/idle-rate}'
+                '/average@100'})
+        self.process(validation_mode='off')
+
+    def test_empty_input(self):
+        # An empty input has no chunks at all
+        for executor in [None, concurrent.futures.ThreadPoolExecutor(2)]:
+            with self.assertRaises(
+                    rcb12_term.validation.validation_error) as cm:
+                rcb12_term.process.process_file_chunks(
+                    [], tqdm(disable=True), executor=executor)
+            self.assertEqual(
+                sorted(cm.exception.report.failures), ['no counters'])
+        vdf = rcb12_term.process.process_file_chunks(
+            [], tqdm(disable=True), validation_mode='off')
+        self.assertEqual(len(vdf), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,199 @@
+import concurrent.futures
+import contextlib
+import io
+import os
+import re
+import shutil
+import tempfile
+import unittest
+import zipfile
+
+import pandas as pd
+
+from pickaxe import loader
+
+raw_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                       'long_runs', 'apr16-queenbee-raw')
+raw_outputs = [
+    os.path.join(raw_dir, 'level_10', 'job_script.sh.o767457'),
+    os.path.join(raw_dir, 'level_13', 'job_script.sh.o767974'),
+]
+
+baseline_columns = ['sys', 'proc', 'type', 'locality', 'value', 'value_unit',
+                    'timestamp', 'iteration', 'nodes']
+
+locality_regex = re.compile(r'/agas\{locality#(\d+)[^}]*\}')
+pfx_counter_regex = re.compile(
+    r'/([a-z_]+){locality#(\d+)/total}/(?:(?:(count|time)/)'
+    '([a-z/_-]+)|([a-z/_-]+)/(?:(count|time))),([0-9]+),'
+    r'([0-9.]+),\[[a-z]+\],([0-9.\+e]+)(?:,\[([a-z]+)?\])?'
+)
+
+
+def baseline_load(path):
+    # The loop plots.py used to read data.zip with, one dict per counter
+    dataset = []
+    with zipfile.ZipFile(path, 'r') as arxiv:
+        for fn in arxiv.namelist():
+            if fn.endswith('.out'):
+                content = arxiv.read(fn).decode('utf-8')
+                localities = set(
+                    int(x) for x in locality_regex.findall(content))
+                if not localities:
+                    continue
+                node_count = max(localities) + 1
+
+                for m in pfx_counter_regex.finditer(content):
+                    is_rev = m.group(3) is not None
+
+                    dataset.append({
+                        'sys': m.group(1),
+                        'proc': (m.group(4) if is_rev
+                                 else m.group(5)).replace('/', '.'),
+                        'type': m.group(3) if is_rev else m.group(6),
+                        'locality': int(m.group(2)),
+                        'value': float(m.group(9)),
+                        'value_unit': m.group(10),
+                        'timestamp': float(m.group(8)),
+                        'iteration': int(m.group(7)),
+                        'nodes': node_count,
+                    })
+    return pd.DataFrame(dataset)
+
+
+def comparable(df):
+    # Strings (categoricals, or str as pandas infers them) as plain
+    # objects, missing units as None
+    df = df[baseline_columns].copy()
+    for name in ['sys', 'proc', 'type', 'value_unit']:
+        df[name] = df[name].astype(object).where(df[name].notna(), None)
+    return df
+
+
+class load_test(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.zip_path = os.path.join(self.dir, 'data.zip')
+        with zipfile.ZipFile(self.zip_path, 'w') as arxiv:
+            # Out of name order: members are loaded in archive order
+            arxiv.write(raw_outputs[1], 'b/1.out')
+            arxiv.writestr('empty.out', 'no counters here\n')
+            arxiv.writestr('notes.txt', 'not an output\n')
+            arxiv.write(raw_outputs[0], 'a/0.out')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def load(self, *args, **kwargs):
+        printed = io.StringIO()
+        with contextlib.redirect_stdout(printed):
+            df = loader.load(*args, **kwargs)
+        return df, printed.getvalue()
+
+    def test_zip(self):
+        expected = comparable(baseline_load(self.zip_path))
+        for kwargs in [{'jobs': 2},
+                       {'executor': concurrent.futures.ThreadPoolExecutor(2)}]:
+            df, printed = self.load(self.zip_path, **kwargs)
+            pd.testing.assert_frame_equal(comparable(df), expected)
+            self.assertEqual(printed.splitlines(), [
+                'Processing "b/1.out"...',
+                'No data found in "empty.out". Skipping...',
+                'Processing "a/0.out"...'])
+
+    def test_plain_outputs(self):
+        # Plain outputs are read in place, in the order given
+        empty = os.path.join(self.dir, 'empty.out')
+        with open(empty, 'w'):
+            pass
+        df, printed = self.load(raw_outputs[::-1] + [empty], jobs=2)
+        pd.testing.assert_frame_equal(
+            comparable(df), comparable(baseline_load(self.zip_path)))
+        self.assertEqual(printed.splitlines()[-1],
+                         'No data found in "{}". Skipping...'.format(empty))
+        self.assertEqual(list(df.job.unique()), ['767974.qb3', '767457.qb3'])
+
+
+# Two outputs whose sys, proc and unit categories partly overlap
+first_output = (
+    b'/agas{locality#0/total}/count/route,1,1.0,[s],3\n'
+    b'/parcels{locality#0/total}/count/sent,1,1.1,[s],4,[bytes]\n')
+second_output = (
+    b'max_level = 13\n'
+    b'/agas{locality#1/total}/count/route,1,2.0,[s],5,[bytes]\n'
+    b'/agas{locality#1/total}/primary/time,1,2.1,[s],6,[ns]\n')
+
+
+class column_buffers_test(unittest.TestCase):
+    def check(self, df):
+        self.assertEqual(list(df.sys.cat.categories), ['agas', 'parcels'])
+        self.assertEqual(list(df.sys.cat.codes), [0, 1, 0, 0])
+        self.assertEqual(list(df.proc.cat.categories),
+                         ['route', 'sent', 'primary'])
+        self.assertEqual(list(df.proc.cat.codes), [0, 1, 0, 2])
+        self.assertEqual(list(df.type.cat.codes), [0, 0, 0, 1])
+        # The first counter has no unit
+        self.assertEqual(list(df.value_unit.cat.categories), ['bytes', 'ns'])
+        self.assertEqual(list(df.value_unit.cat.codes), [-1, 0, 0, 1])
+        self.assertTrue(pd.isna(df.value_unit[0]))
+        self.assertEqual(list(df.job.cat.codes), [-1] * 4)
+
+        self.assertEqual(list(df.locality), [0, 0, 1, 1])
+        self.assertEqual(list(df.nodes), [1, 1, 2, 2])
+        self.assertEqual(list(df.max_level), [-1, -1, 13, 13])
+        self.assertEqual(list(df.value), [3.0, 4.0, 5.0, 6.0])
+        for name in ['locality', 'iteration', 'nodes', 'max_level']:
+            self.assertEqual(df[name].dtype, 'int64')
+        for name in ['value', 'timestamp']:
+            self.assertEqual(df[name].dtype, 'float64')
+
+    def test_extend(self):
+        buffers = loader.column_buffers()
+        for content in [first_output, second_output]:
+            buffers.extend(loader.parse_output(content))
+        self.check(buffers.frame())
+
+    def test_window(self):
+        # One output in flight at a time, collected as each one is added
+        path = os.path.join(tempfile.mkdtemp(), 'data.zip')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        with zipfile.ZipFile(path, 'w') as arxiv:
+            arxiv.writestr('0.out', first_output)
+            arxiv.writestr('1.out', second_output)
+            arxiv.writestr('2.out', 'no counters here\n')
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.check(loader.load(path, jobs=1, window=1))
+            executor = lazy_executor()
+            self.check(loader.load(path, executor=executor, window=1))
+        # The output before was taken in before the next one was read
+        self.assertEqual(executor.outstanding, [0, 1, 1])
+
+
+class lazy_executor(object):
+    # Runs a task only once its result is asked for, and records how many
+    # earlier tasks nobody had asked for yet at each submit
+    def __init__(self):
+        self.pending = []
+        self.outstanding = []
+
+    def submit(self, fn, *args):
+        self.outstanding.append(len(self.pending))
+        task = lazy_task(self, fn, args)
+        self.pending.append(task)
+        return task
+
+
+class lazy_task(object):
+    def __init__(self, executor, fn, args):
+        self.executor = executor
+        self.fn = fn
+        self.args = args
+
+    def result(self):
+        self.executor.pending.remove(self)
+        return self.fn(*self.args)
+
+
+if __name__ == '__main__':
+    unittest.main()
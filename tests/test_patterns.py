@@ -0,0 +1,64 @@
+import unittest
+
+from pickaxe.loader import parse_output
+from pickaxe.patterns import output_scan
+
+header = (
+    'Job ID:    765915.qb3\n'
+    'Node:      qb019 (7159)\n'
+)
+counters = (
+    '/agas{locality#0/total}/count/route,1,1.832590,[s],1\n'
+    '/agas{locality#1/total}/count/route,1,1.770243,[s],0\n'
+    '/agas{locality#0/total}/primary/time,1,1.897817,[s],250\n'
+    '/parcels{locality#0/total}/count/sent,1,1.869389,[s],4133\n'
+)
+
+
+class output_scan_test(unittest.TestCase):
+    def scans(self, content):
+        # Text and bytes are scanned alike
+        return [output_scan(content), output_scan(content.encode())]
+
+    def test_counter_on_first_line(self):
+        for scan in self.scans(counters):
+            self.assertEqual(len(scan.counters), 4)
+            self.assertEqual(scan.node_count, 2)
+
+        for scan in self.scans('\n' + counters):
+            self.assertEqual(len(scan.counters), 4)
+
+    def test_agas_lines_count_localities(self):
+        content = counters + (
+            '/agas{locality#5/pool#default/worker-thread#0}/count/route,'
+            '1,1.8,[s],3\n'
+            'not an AGAS line: /parcels{locality#9/total}\n')
+        for scan in self.scans(content):
+            self.assertEqual(len(scan.counters), 4)
+            self.assertEqual(scan.node_count, 6)
+
+    def test_last_max_level(self):
+        content = 'max_level = 3\n' + counters + 'max_level = 5\n'
+        for scan in self.scans(content):
+            self.assertEqual(scan.max_level, 5)
+        for scan in self.scans(counters):
+            self.assertIsNone(scan.max_level)
+
+    def test_first_pbs_header(self):
+        content = header + counters + 'Job ID:    765916.qb3  \n'
+        for scan in self.scans(content):
+            self.assertEqual(scan.pbs_header, {
+                'Job ID': '765915.qb3', 'Node': 'qb019 (7159)'})
+
+    def test_no_agas_lines(self):
+        content = header + (
+            '/parcels{locality#7/total}/count/sent,1,1.869389,[s],4133\n')
+        for scan in self.scans(content):
+            self.assertEqual(len(scan.counters), 1)
+            self.assertIsNone(scan.node_count)
+        # Nothing to count the nodes by, so the output is skipped
+        self.assertIsNone(parse_output(content.encode()))
+
+
+if __name__ == '__main__':
+    unittest.main()